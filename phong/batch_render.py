@@ -0,0 +1,142 @@
+import os
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+import shared_path
+import re
+import time
+import hashlib
+import argparse
+from math import pi, sin, cos, hypot
+from multiprocessing import Pool
+import numpy as np
+import pygame
+from pygame import Surface
+from material import Material
+from sphere_camera import SphereCamera, SHADING_QUADS, SHADING_PIXELS, DEFAULT_LIGHT_POSITION
+from example_materials import metal_material, wood_material, plastic_material, chalk_material
+from example_scenes import spheres_scene
+from tile_renderer import shade_tile
+from main import BLACK, WIDTH, HEIGHT, SPHERE_RADIUS
+
+BATCH_VERSION = 2
+SCENE_SPHERE = 'sphere'
+SCENE_SPHERES = 'spheres'
+HASH_LENGTH = 16
+TEMPORARY_SUFFIX = '.tmp'
+FRAME_PATTERN = re.compile(r'^frame_\d+_([0-9a-f]{%d})\.png$' % HASH_LENGTH)
+MATERIALS = {'metal': metal_material, 'wood': wood_material, 'plastic': plastic_material, 'chalk': chalk_material}
+LIGHT_ORBIT_RADIUS = hypot(DEFAULT_LIGHT_POSITION[0], DEFAULT_LIGHT_POSITION[1])
+LIGHT_PATHS = {
+    'orbit': lambda t: (LIGHT_ORBIT_RADIUS * cos(2 * pi * t), LIGHT_ORBIT_RADIUS * sin(2 * pi * t), DEFAULT_LIGHT_POSITION[2]),
+    'sweep': lambda t: (2 * t - 1, DEFAULT_LIGHT_POSITION[1], DEFAULT_LIGHT_POSITION[2]),
+    'arc': lambda t: (0.0, sin(pi * t), cos(pi * t))
+}
+
+_cameras: dict[tuple[int, int], SphereCamera] = {}
+
+def render_frame(path: str, scene_name: str, material: Material, light_position: tuple[float, float, float], radius: float,
+                 resolution: tuple[int, int], shading_mode: str) -> str:
+    screen = Surface(resolution)
+    screen.fill(BLACK)
+    if scene_name == SCENE_SPHERES:
+        spheres_scene.lights[0].position = light_position
+        spheres_scene.spheres[0].material = material
+        frame = np.zeros((resolution[0], resolution[1], 3), dtype=np.uint8)
+        shade_tile(frame, spheres_scene, (resolution[0] // 2, resolution[1] // 2), (0, 0, resolution[0], resolution[1]))
+        pygame.surfarray.blit_array(screen, frame)
+    else:
+        camera = _cameras.get(resolution)
+        if camera is None:
+            camera = _cameras[resolution] = SphereCamera((resolution[0] // 2, resolution[1] // 2), material)
+        camera.material = material
+        camera.light_position = light_position
+        camera.shading_mode = shading_mode
+        camera.draw_sphere(screen, radius)
+    temporary_path = path + TEMPORARY_SUFFIX
+    with open(temporary_path, 'wb') as file:
+        pygame.image.save(screen, file, 'png')
+    os.replace(temporary_path, path)
+    return path
+
+def _render_frame(frame: tuple) -> str:
+    return render_frame(*frame)
+
+def frame_hash(scene_name: str, material: Material, light_position: tuple[float, float, float], radius: float,
+               resolution: tuple[int, int], shading_mode: str) -> str:
+    parameters = (BATCH_VERSION, scene_name, material.color, material.ambient, material.diffuse, material.specular, material.shininess,
+                  tuple(round(coordinate, 9) for coordinate in light_position), radius, resolution, shading_mode)
+    return hashlib.sha256(repr(parameters).encode()).hexdigest()[:HASH_LENGTH]
+
+def parse_resolution(value: str) -> tuple[int, int]:
+    try:
+        width, height = (int(size) for size in value.lower().split('x'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected WIDTHxHEIGHT, got {value!r}")
+    return width, height
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless batch render of Phong light and material sweeps to a PNG sequence")
+    parser.add_argument('output_directory')
+    parser.add_argument('--scene', choices=[SCENE_SPHERE, SCENE_SPHERES], default=SCENE_SPHERE,
+                        help="single sphere camera or the example multi-sphere scene, whose first light and sphere follow the sweep")
+    parser.add_argument('--light-path', choices=sorted(LIGHT_PATHS), default='orbit')
+    parser.add_argument('--light-frames', type=int, default=36, help="light positions sampled along the path")
+    parser.add_argument('--materials', nargs='+', choices=sorted(MATERIALS), default=list(MATERIALS))
+    parser.add_argument('--radii', nargs='+', type=float, default=[SPHERE_RADIUS], help="sphere radii (single sphere scene only)")
+    parser.add_argument('--resolutions', nargs='+', type=parse_resolution, default=[(WIDTH, HEIGHT)], help="WIDTHxHEIGHT")
+    parser.add_argument('--shading', choices=[SHADING_PIXELS, SHADING_QUADS], default=SHADING_PIXELS)
+    parser.add_argument('--processes', type=int, help="worker processes (default: all cores)")
+    arguments = parser.parse_args()
+
+    os.makedirs(arguments.output_directory, exist_ok=True)
+    existing: dict[str, str] = {}
+    stale: list[str] = []
+    for entry in sorted(os.listdir(arguments.output_directory)):
+        if entry.endswith(TEMPORARY_SUFFIX) and FRAME_PATTERN.match(entry[:-len(TEMPORARY_SUFFIX)]):
+            os.remove(os.path.join(arguments.output_directory, entry))
+            continue
+        match = FRAME_PATTERN.match(entry)
+        if match:
+            if match.group(1) in existing:
+                stale.append(os.path.join(arguments.output_directory, entry))
+            else:
+                existing[match.group(1)] = os.path.join(arguments.output_directory, entry)
+
+    light_path = LIGHT_PATHS[arguments.light_path]
+    light_positions = [light_path(frame / arguments.light_frames) for frame in range(arguments.light_frames)]
+    radii = arguments.radii if arguments.scene == SCENE_SPHERE else [0.0]
+    frames = []
+    skipped = 0
+    index = 0
+    for resolution in arguments.resolutions:
+        for radius in radii:
+            for material_name in arguments.materials:
+                for light_position in light_positions:
+                    material = MATERIALS[material_name]
+                    parameters_hash = frame_hash(arguments.scene, material, light_position, radius, resolution, arguments.shading)
+                    path = os.path.join(arguments.output_directory, f"frame_{index:06d}_{parameters_hash}.png")
+                    index += 1
+                    if parameters_hash in existing:
+                        existing_path = existing.pop(parameters_hash)
+                        if existing_path != path:
+                            os.replace(existing_path, path)
+                        skipped += 1
+                        continue
+                    frames.append((path, arguments.scene, material, light_position, radius, resolution, arguments.shading))
+    stale.extend(existing.values())
+    for stale_path in stale:
+        os.remove(stale_path)
+
+    start = time.perf_counter()
+    if arguments.processes == 1:
+        for frame in frames:
+            render_frame(*frame)
+    else:
+        with Pool(arguments.processes) as pool:
+            for _ in pool.imap_unordered(_render_frame, frames):
+                pass
+    print(f"Rendered {len(frames)} frames to {arguments.output_directory} in {time.perf_counter() - start:.1f} s, "
+          f"skipped {skipped} already rendered, removed {len(stale)} stale")
+
+if __name__ == "__main__":
+    main()
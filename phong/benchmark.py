@@ -0,0 +1,112 @@
+import os
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+import sys
+import shared_path
+import json
+import argparse
+from typing import TextIO
+from pygame import Surface
+from sphere_camera import SphereCamera, SHADING_QUADS, SHADING_PIXELS, LIGHT_MOVE_STEP, DEFAULT_PIXELS_PER_FACET
+from tile_renderer import TileRenderer, DEFAULT_TILE_SIZE
+from example_scenes import spheres_scene
+from instrumentation import Instrumentation
+from example_materials import metal_material, wood_material, plastic_material, chalk_material
+from main import BLACK, WIDTH, HEIGHT, SPHERE_RADIUS
+
+MATERIALS = [metal_material, wood_material, plastic_material, chalk_material]
+INPUT_PATHS = {
+    'light': ['move_light_left', 'move_light_up', 'move_light_forward', 'move_light_right', 'move_light_down', 'move_light_backward'],
+    'materials': ['material'],
+    'mixed': ['move_light_left', 'material', 'move_light_up', 'reset_light_position', 'material', 'move_light_backward']
+}
+LIGHT_MOVES = {
+    'move_light_left': (LIGHT_MOVE_STEP, 0, 0),
+    'move_light_right': (-LIGHT_MOVE_STEP, 0, 0),
+    'move_light_up': (0, LIGHT_MOVE_STEP, 0),
+    'move_light_down': (0, -LIGHT_MOVE_STEP, 0),
+    'move_light_forward': (0, 0, -LIGHT_MOVE_STEP),
+    'move_light_backward': (0, 0, LIGHT_MOVE_STEP)
+}
+RENDERER_SPHERE = 'sphere'
+RENDERER_TILES = 'tiles'
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless benchmark of the Phong sphere renderer")
+    parser.add_argument('--path', choices=sorted(INPUT_PATHS), default='mixed')
+    parser.add_argument('--frames', type=int, default=30)
+    parser.add_argument('--shading', choices=[SHADING_PIXELS, SHADING_QUADS], default=SHADING_PIXELS)
+    parser.add_argument('--radius', type=float, default=SPHERE_RADIUS)
+    parser.add_argument('--width', type=int, default=WIDTH)
+    parser.add_argument('--height', type=int, default=HEIGHT)
+    parser.add_argument('--pixels-per-facet', type=float, default=DEFAULT_PIXELS_PER_FACET,
+                        help="target facet size used to choose the quad tessellation level")
+    parser.add_argument('--tessellation-step', type=int, help="fixed quad tessellation step in degrees instead of the adaptive level")
+    parser.add_argument('--renderer', choices=[RENDERER_SPHERE, RENDERER_TILES], default=RENDERER_SPHERE,
+                        help="single sphere camera or the tile-parallel renderer over the example multi-sphere scene")
+    parser.add_argument('--processes', type=int, help="worker processes for the tile renderer (default: all cores)")
+    parser.add_argument('--tile-size', type=int, default=DEFAULT_TILE_SIZE)
+    parser.add_argument('--export-stats', help="append periodic JSON-lines instrumentation records to this file")
+    parser.add_argument('--output', help="write the JSON report to this file instead of stdout")
+    arguments = parser.parse_args()
+
+    instrumentation = Instrumentation(record_frames=True, export_filename=arguments.export_stats)
+    camera = SphereCamera((arguments.width // 2, arguments.height // 2), MATERIALS[0], instrumentation, arguments.shading)
+    camera.pixels_per_facet = arguments.pixels_per_facet
+    camera.tessellation_step = arguments.tessellation_step
+    screen = Surface((arguments.width, arguments.height))
+    actions = INPUT_PATHS[arguments.path]
+    if arguments.renderer == RENDERER_TILES:
+        tile_renderer = TileRenderer(arguments.width, arguments.height, arguments.tile_size, arguments.processes, instrumentation)
+    scene_light = spheres_scene.lights[0]
+    initial_light_position = scene_light.position
+    material_index = 0
+    for frame in range(arguments.frames):
+        action = actions[frame % len(actions)]
+        if action == 'material':
+            material_index = (material_index + 1) % len(MATERIALS)
+            camera.material = MATERIALS[material_index]
+            spheres_scene.spheres[0].material = MATERIALS[material_index]
+        else:
+            getattr(camera, action)()
+            if action in LIGHT_MOVES:
+                scene_light.position = tuple(position + step for position, step in zip(scene_light.position, LIGHT_MOVES[action]))
+            else:
+                scene_light.position = initial_light_position
+        instrumentation.begin_frame()
+        screen.fill(BLACK)
+        if arguments.renderer == RENDERER_TILES:
+            tile_renderer.render(screen, spheres_scene)
+        else:
+            camera.draw_sphere(screen, arguments.radius)
+        instrumentation.end_frame()
+    if arguments.renderer == RENDERER_TILES:
+        tile_renderer.close()
+
+    report = {
+        'renderer': 'phong',
+        'path': arguments.path,
+        'frames': arguments.frames,
+        'resolution': [arguments.width, arguments.height],
+        'radius': arguments.radius,
+        'shading': arguments.shading,
+        'pixels_per_facet': arguments.pixels_per_facet,
+        'tessellation_step': arguments.tessellation_step,
+        'sphere_renderer': arguments.renderer,
+        'processes': arguments.processes,
+        'stages': instrumentation.summary(),
+        'counters': instrumentation.counter_summary()
+    }
+    instrumentation.flush()
+    if arguments.output:
+        with open(arguments.output, 'w') as output:
+            write_report(report, output)
+    else:
+        write_report(report, sys.stdout)
+
+def write_report(report: dict, output: TextIO) -> None:
+    json.dump(report, output, indent=2)
+    output.write('\n')
+
+if __name__ == "__main__":
+    main()
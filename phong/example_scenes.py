@@ -0,0 +1,11 @@
+from scene import Scene, Sphere, Light
+from example_materials import metal_material, chalk_material, plastic_material, wood_material
+
+spheres_scene = Scene(
+    [Sphere((-180, -180, 0), 150, metal_material),
+     Sphere((180, -180, 0), 150, wood_material),
+     Sphere((-180, 180, 0), 150, plastic_material),
+     Sphere((180, 180, 0), 150, chalk_material),
+     Sphere((0, 0, 100), 120, metal_material)],
+    [Light((0.75, 0.5, 0.5)),
+     Light((-0.5, -0.25, 0.25))])
@@ -1,13 +1,16 @@
 import pygame
 from sphere_camera import SphereCamera
+from frame_governor import FrameGovernor
 from example_materials import metal_material, chalk_material, plastic_material, wood_material
 
 class KeyboardHandler:
-    def __init__(self, camera: SphereCamera) -> None:
+    def __init__(self, camera: SphereCamera, frame_governor: FrameGovernor = None) -> None:
         self.camera = camera
+        self.frame_governor = frame_governor
 
-    def handle_keyboard_events(self) -> None:
-        for event in pygame.event.get():
+    def handle_keyboard_events(self, block: bool = False) -> None:
+        events = [pygame.event.wait()] + pygame.event.get() if block else pygame.event.get()
+        for event in events:
             if event.type == pygame.QUIT:
                 pygame.quit()
                 exit()
@@ -37,4 +40,11 @@ class KeyboardHandler:
                 if event.key == pygame.K_3:
                     self.camera.material = plastic_material
                 if event.key == pygame.K_4:
-                    self.camera.material = chalk_material
\ No newline at end of file
+                    self.camera.material = chalk_material
+                if event.key == pygame.K_p:
+                    self.camera.toggle_shading_mode()
+                if event.key == pygame.K_i:
+                    self.camera.instrumentation.toggle_overlay()
+                if event.key == pygame.K_g and self.frame_governor is not None:
+                    self.frame_governor.toggle()
+                    self.camera.set_quality_level(self.frame_governor.level)
@@ -1,12 +1,22 @@
+import shared_path
+import time
 import pygame
-from sphere_camera import SphereCamera
+from sphere_camera import SphereCamera, QUALITY_LEVELS
 from keyboard_handler import KeyboardHandler
+from frame_governor import FrameGovernor
+from instrumentation import Instrumentation
 from example_materials import metal_material
+from example_scenes import spheres_scene
+from tile_renderer import TileRenderer, DEFAULT_TILE_SIZE
 
 BLACK = (0, 0, 0)
 WIDTH, HEIGHT = 800, 800
 FPS = 60
+FRAME_BUDGET = 1 / FPS
 SPHERE_RADIUS = 200
+STATS_EXPORT_FILENAME = None
+MULTI_SPHERE_SCENE = False
+TILE_PROCESSES = None
 
 def main():
     pygame.display.set_caption("Grafika komputerowa - projekt")
@@ -14,16 +24,47 @@ def main():
 
     screen_center = (WIDTH // 2, HEIGHT // 2)
 
-    camera = SphereCamera(screen_center, metal_material)
-    keyboard_handler = KeyboardHandler(camera)
+    instrumentation = Instrumentation(export_filename=STATS_EXPORT_FILENAME)
+    camera = SphereCamera(screen_center, metal_material, instrumentation)
+    tile_renderer = None
+    frame_governor = None
+    if MULTI_SPHERE_SCENE:
+        tile_renderer = TileRenderer(WIDTH, HEIGHT, DEFAULT_TILE_SIZE, TILE_PROCESSES, instrumentation)
+    else:
+        frame_governor = FrameGovernor(QUALITY_LEVELS, FRAME_BUDGET)
+    keyboard_handler = KeyboardHandler(camera, frame_governor)
     clock = pygame.time.Clock()
+    frame = screen.copy()
 
-    while True:
-        clock.tick(FPS)
-        keyboard_handler.handle_keyboard_events()
-        screen.fill(BLACK)
-        camera.draw_sphere(screen, SPHERE_RADIUS)
-        pygame.display.update()
+    try:
+        while True:
+            clock.tick(FPS)
+            keyboard_handler.handle_keyboard_events(block=not camera.dirty)
+            if camera.dirty:
+                instrumentation.begin_frame()
+                draw_start = time.perf_counter()
+                frame.fill(BLACK)
+                if tile_renderer is not None:
+                    draw_spheres_scene(camera, tile_renderer, frame)
+                else:
+                    camera.draw_sphere(frame, SPHERE_RADIUS)
+                instrumentation.end_frame()
+                if frame_governor is not None and frame_governor.record(time.perf_counter() - draw_start):
+                    camera.set_quality_level(frame_governor.level)
+            screen.blit(frame, (0, 0))
+            instrumentation.draw_overlay(screen)
+            if frame_governor is not None:
+                frame_governor.draw_indicator(screen)
+            pygame.display.update()
+    finally:
+        if tile_renderer is not None:
+            tile_renderer.close()
+
+def draw_spheres_scene(camera: SphereCamera, tile_renderer: TileRenderer, screen: pygame.Surface) -> None:
+    camera.dirty = False
+    spheres_scene.lights[0].position = camera.light_position
+    spheres_scene.spheres[0].material = camera.material
+    tile_renderer.render(screen, spheres_scene)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,26 @@
+from material import Material
+
+class Sphere:
+    def __init__(self, center: tuple[float, float, float], radius: float, material: Material) -> None:
+        self.center = center
+        self.radius = radius
+        self.material = material
+
+class Light:
+    def __init__(self, position: tuple[float, float, float]) -> None:
+        self.position = position
+
+class Scene:
+    def __init__(self, spheres: list[Sphere] = None, lights: list[Light] = None) -> None:
+        self.spheres = spheres if spheres is not None else []
+        self.lights = lights if lights is not None else []
+
+    def add_sphere(self, sphere: Sphere) -> None:
+        self.spheres.append(sphere)
+
+    def add_light(self, light: Light) -> None:
+        self.lights.append(light)
+
+    @property
+    def light_positions(self) -> list[tuple[float, float, float]]:
+        return [light.position for light in self.lights]
@@ -0,0 +1,12 @@
+import numpy as np
+from material import Material
+
+def calculate_intensities(normals: np.ndarray, material: Material, light_positions: list[tuple[float, float, float]]) -> np.ndarray:
+    intensities = np.full(len(normals), float(material.ambient))
+    for light_position in light_positions:
+        light_position = np.array(light_position, dtype=np.float64)
+        normal_dot_light = normals @ light_position
+        intensities += np.maximum(0, normal_dot_light) * material.diffuse
+        reflected_light_z = -light_position[2] + 2 * normal_dot_light * normals[:, 2]
+        intensities += np.maximum(0, reflected_light_z) ** material.shininess * material.specular
+    return np.minimum(1, intensities)
@@ -1,16 +1,70 @@
-from math import sin, cos, radians, sqrt
+import numpy as np
+from math import degrees, sqrt
 import pygame
 from pygame import Surface
 from material import Material
+from instrumentation import Instrumentation
+from shading import calculate_intensities
 
 LIGHT_MOVE_STEP = 0.1
 DEFAULT_LIGHT_POSITION = (0.75, 0.5, 0.5)
+SHADING_QUADS = 'quads'
+SHADING_PIXELS = 'pixels'
+DEFAULT_PIXELS_PER_FACET = 16
+TESSELLATION_STEPS = np.array([1, 2, 3, 4, 5, 6, 9, 10, 12, 15, 18, 20, 30])
+RING_STEPS = np.array([1, 2, 3, 4, 5, 6, 8, 9, 10, 12, 15, 18, 20, 24, 30, 36, 40, 45, 60, 90])
+QUALITY_FULL = 'full'
+QUALITY_COARSE_TESSELLATION = 'coarse tessellation'
+QUALITY_HALF_RESOLUTION = 'half resolution'
+QUALITY_LEVELS = (QUALITY_FULL, QUALITY_COARSE_TESSELLATION, QUALITY_HALF_RESOLUTION)
+COARSE_TESSELLATION_FACTOR = 16
+LOW_RESOLUTION_SCALE = 0.5
 
 class SphereCamera:
-    def __init__(self, screen_center: tuple[int, int], material: Material) -> None:
+    def __init__(self, screen_center: tuple[int, int], material: Material, instrumentation: Instrumentation = None,
+                 shading_mode: str = SHADING_PIXELS) -> None:
         self.screen_center = screen_center
+        self.dirty = True
         self.light_position = DEFAULT_LIGHT_POSITION
         self.material = material
+        self.instrumentation = instrumentation if instrumentation is not None else Instrumentation()
+        self.shading_mode = shading_mode
+        self.tessellation_step: int = None
+        self.pixels_per_facet = DEFAULT_PIXELS_PER_FACET
+        self.quality_level = 0
+        self.__lod_meshes: dict[int, tuple[np.ndarray, np.ndarray]] = {}
+        self.__quad_mesh_key: tuple = None
+        self.__quad_mesh: tuple[list, np.ndarray] = None
+        self.__pixel_normals_key: tuple = None
+        self.__pixel_normals: tuple[np.ndarray, np.ndarray, np.ndarray] = None
+        self.__pixel_frame: np.ndarray = None
+        self.__low_resolution_surface: Surface = None
+
+    @property
+    def light_position(self) -> tuple[float, float, float]:
+        return self.__light_position
+
+    @light_position.setter
+    def light_position(self, light_position: tuple[float, float, float]) -> None:
+        self.__light_position = light_position
+        self.dirty = True
+
+    @property
+    def material(self) -> Material:
+        return self.__material
+
+    @material.setter
+    def material(self, material: Material) -> None:
+        self.__material = material
+        self.dirty = True
+
+    def toggle_shading_mode(self) -> None:
+        self.shading_mode = SHADING_QUADS if self.shading_mode == SHADING_PIXELS else SHADING_PIXELS
+        self.dirty = True
+
+    def set_quality_level(self, quality_level: int) -> None:
+        self.quality_level = quality_level
+        self.dirty = True
 
     def move_light_up(self) -> None:
         self.light_position = (self.light_position[0], self.light_position[1] + LIGHT_MOVE_STEP, self.light_position[2])
@@ -34,75 +88,128 @@ class SphereCamera:
         self.light_position = DEFAULT_LIGHT_POSITION
 
     def draw_sphere(self, screen: Surface, radius: float) -> None:
-        for i in range(360):
-            for j in range(180):
-                theta1 = radians(i)
-                theta2 = radians(i + 1)
-                phi1 = radians(j)
-                phi2 = radians(j + 1)
-
-                x1, y1, z1 = self.__convert_to_cartesian_coordinates(radius, theta1, phi1)
-                x2, y2, z2 = self.__convert_to_cartesian_coordinates(radius, theta2, phi1)
-                x3, y3, z3 = self.__convert_to_cartesian_coordinates(radius, theta1, phi2)
-                x4, y4, z4 = self.__convert_to_cartesian_coordinates(radius, theta2, phi2)
-
-                normal = self.__calculate_normal_vector((x1, y1, z1), (x2, y2, z2), (x3, y3, z3))
-                intensity = self.__calculate_intensity(normal)
-
-                red, green, blue = self.material.color
-                color = (int(red * intensity),
-                         int(green * intensity),
-                         int(blue * intensity))
-
-                x1, y1 = self.__move_to_screen_center((x1, y1))
-                x2, y2 = self.__move_to_screen_center((x2, y2))
-                x3, y3 = self.__move_to_screen_center((x3, y3))
-                x4, y4 = self.__move_to_screen_center((x4, y4))
-
-                pygame.draw.polygon(screen, color, [(x1, y1), (x2, y2), (x4, y4), (x3, y3)])
-
-    def __convert_to_cartesian_coordinates(self, radius: float, theta: float, phi: float) -> tuple[float, float, float]:
-        x = radius * sin(phi) * cos(theta)
-        y = radius * sin(phi) * sin(theta)
-        z = radius * cos(phi)
-        return x, y, z
-    
-    def __move_to_screen_center(self, point: tuple[float, float]) -> tuple[float, float]:
-        x, y = point
-        x += self.screen_center[0]
-        y += self.screen_center[1]
-        return x, y
-    
-    def __calculate_normal_vector(self, v1: tuple[float, float, float], v2: tuple[float, float, float], v3: tuple[float, float, float]) -> tuple[float, float, float]:
-        x1, y1, z1 = v1
-        x2, y2, z2 = v2
-        x3, y3, z3 = v3
-
-        a = (y2 - y1) * (z3 - z1) - (z2 - z1) * (y3 - y1)
-        b = (z2 - z1) * (x3 - x1) - (x2 - x1) * (z3 - z1)
-        c = (x2 - x1) * (y3 - y1) - (y2 - y1) * (x3 - x1)
-
-        length = sqrt(a ** 2 + b ** 2 + c ** 2)
-
-        if length == 0:
-            return 0, 0, 0
-        else:
-            return a / length, b / length, c / length
-
-    def __calculate_intensity(self, normal: tuple[float, float, float]) -> float:
-        diffuse = max(0, normal[0] * self.light_position[0] +
-                      normal[1] * self.light_position[1] +
-                      normal[2] * self.light_position[2]) * self.material.diffuse
-
-        reflection = 2 * (normal[0] * self.light_position[0] +
-                          normal[1] * self.light_position[1] +
-                          normal[2] * self.light_position[2])
-        reflected_light = (-self.light_position[0] + reflection * normal[0],
-                           -self.light_position[1] + reflection * normal[1],
-                           -self.light_position[2] + reflection * normal[2])
-
-        specular = max(0, reflected_light[0] * 0 +
-                       reflected_light[1] * 0 +
-                       reflected_light[2] * 1) ** self.material.shininess * self.material.specular
-
-        return min(1, self.material.ambient + diffuse + specular)
+        self.dirty = False
+        if self.quality_level < QUALITY_LEVELS.index(QUALITY_HALF_RESOLUTION):
+            self.__draw_shaded_sphere(screen, self.screen_center, radius)
+            return
+
+        target = self.__create_render_target(screen)
+        screen_center = (self.screen_center[0] * LOW_RESOLUTION_SCALE, self.screen_center[1] * LOW_RESOLUTION_SCALE)
+        self.__draw_shaded_sphere(target, screen_center, radius * LOW_RESOLUTION_SCALE)
+        with self.instrumentation.stage('drawing'):
+            pygame.transform.scale(target, screen.get_size(), screen)
+
+    def __draw_shaded_sphere(self, screen: Surface, screen_center: tuple[float, float], radius: float) -> None:
+        coarse = self.quality_level >= QUALITY_LEVELS.index(QUALITY_COARSE_TESSELLATION)
+        if self.shading_mode == SHADING_PIXELS and not coarse:
+            self.__draw_pixels(screen, screen_center, radius)
+            return
+        pixels_per_facet = self.pixels_per_facet * COARSE_TESSELLATION_FACTOR if coarse else self.pixels_per_facet
+        self.__draw_quads(screen, screen_center, radius, pixels_per_facet)
+
+    def __create_render_target(self, screen: Surface) -> Surface:
+        size = (int(screen.get_width() * LOW_RESOLUTION_SCALE), int(screen.get_height() * LOW_RESOLUTION_SCALE))
+        if self.__low_resolution_surface is None or self.__low_resolution_surface.get_size() != size:
+            self.__low_resolution_surface = Surface(size)
+        pygame.transform.scale(screen, size, self.__low_resolution_surface)
+        return self.__low_resolution_surface
+
+    def __draw_pixels(self, screen: Surface, screen_center: tuple[float, float], radius: float) -> None:
+        with self.instrumentation.stage('shading'):
+            pixel_x, pixel_y, normals = self.__calculate_pixel_normals(screen.get_size(), screen_center, radius)
+            intensities = calculate_intensities(normals, self.material, [self.light_position])
+            colors = (np.array(self.material.color, dtype=np.float64) * intensities[:, None]).astype(np.uint8)
+            self.instrumentation.count('shaded_pixels', len(normals))
+        with self.instrumentation.stage('drawing'):
+            frame = self.__pixel_frame
+            frame[pixel_x, pixel_y] = colors
+            pygame.surfarray.blit_array(screen, frame)
+
+    def __calculate_pixel_normals(self, screen_size: tuple[int, int], screen_center: tuple[float, float],
+                                  radius: float) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        key = (screen_size, tuple(screen_center), radius)
+        if key == self.__pixel_normals_key:
+            return self.__pixel_normals
+
+        width, height = screen_size
+        center_x, center_y = screen_center
+        pixel_x, pixel_y = np.meshgrid(np.arange(max(int(center_x - radius), 0), min(int(center_x + radius) + 1, width)),
+                                       np.arange(max(int(center_y - radius), 0), min(int(center_y + radius) + 1, height)),
+                                       indexing='ij')
+        offset_x = pixel_x - center_x
+        offset_y = pixel_y - center_y
+        depth_squared = radius ** 2 - offset_x ** 2 - offset_y ** 2
+        covered = depth_squared >= 0
+        normals = np.stack([-offset_x[covered], -offset_y[covered], np.sqrt(depth_squared[covered])], axis=1) / radius
+        self.__pixel_normals_key = key
+        self.__pixel_normals = (pixel_x[covered], pixel_y[covered], normals)
+        self.__pixel_frame = np.zeros((width, height, 3), dtype=np.uint8)
+        return self.__pixel_normals
+
+    def __draw_quads(self, screen: Surface, screen_center: tuple[float, float], radius: float, pixels_per_facet: float) -> None:
+        with self.instrumentation.stage('shading'):
+            quads, normals = self.__calculate_quad_mesh(screen_center, radius, pixels_per_facet)
+            intensities = calculate_intensities(normals, self.material, [self.light_position])
+            colors = (np.array(self.material.color, dtype=np.float64) * intensities[:, None]).astype(int).tolist()
+            self.instrumentation.count('quads', len(quads))
+        with self.instrumentation.stage('drawing'):
+            for quad, color in zip(quads, colors):
+                pygame.draw.polygon(screen, color, quad)
+
+    def __calculate_quad_mesh(self, screen_center: tuple[float, float], radius: float, pixels_per_facet: float) -> tuple[list, np.ndarray]:
+        step = self.tessellation_step if self.tessellation_step is not None else self.__choose_tessellation_step(radius, pixels_per_facet)
+        self.instrumentation.set_statistics({'tessellation_step': step})
+        key = (radius, step, tuple(screen_center))
+        if key == self.__quad_mesh_key:
+            return self.__quad_mesh
+
+        if step not in self.__lod_meshes:
+            self.__lod_meshes[step] = self.__create_lod_mesh(step)
+        corners, normals = self.__lod_meshes[step]
+        corners = corners * radius + np.array(screen_center, dtype=np.float64)
+
+        self.__quad_mesh_key = key
+        self.__quad_mesh = (corners.tolist(), normals)
+        return self.__quad_mesh
+
+    def __choose_tessellation_step(self, radius: float, pixels_per_facet: float) -> int:
+        ideal_step = degrees(sqrt(pixels_per_facet) / radius) if radius > 0 else TESSELLATION_STEPS[-1]
+        index = max(np.searchsorted(TESSELLATION_STEPS, ideal_step, side='right') - 1, 0)
+        return int(TESSELLATION_STEPS[index])
+
+    def __create_lod_mesh(self, step: int) -> tuple[np.ndarray, np.ndarray]:
+        band_phi = np.arange(0, 180, step)
+        ring_radii = np.maximum(np.sin(np.radians(band_phi)), np.sin(np.radians(band_phi + step)))
+        ring_steps = RING_STEPS[np.searchsorted(RING_STEPS, step / ring_radii, side='right') - 1]
+        ring_counts = 360 // ring_steps
+
+        phi1 = np.repeat(band_phi, ring_counts)
+        theta_steps = np.repeat(ring_steps, ring_counts)
+        theta1 = (np.arange(len(phi1)) - np.repeat(np.cumsum(ring_counts) - ring_counts, ring_counts)) * theta_steps
+        order = np.lexsort((phi1, theta1))
+        phi1, theta1, theta_steps = phi1[order], theta1[order], theta_steps[order]
+        theta2 = theta1 + theta_steps
+        phi2 = phi1 + step
+
+        v1 = self.__convert_to_cartesian_coordinates(np.radians(theta1), np.radians(phi1))
+        v2 = self.__convert_to_cartesian_coordinates(np.radians(theta2), np.radians(phi1))
+        v3 = self.__convert_to_cartesian_coordinates(np.radians(theta1), np.radians(phi2))
+        v4 = self.__convert_to_cartesian_coordinates(np.radians(theta2), np.radians(phi2))
+
+        normals = self.__calculate_normal_vectors(v1, v2, v3)
+        corners = np.stack([v1[:, :2], v2[:, :2], v4[:, :2], v3[:, :2]], axis=1)
+        return corners, normals
+
+    def __convert_to_cartesian_coordinates(self, theta: np.ndarray, phi: np.ndarray) -> np.ndarray:
+        x = np.sin(phi) * np.cos(theta)
+        y = np.sin(phi) * np.sin(theta)
+        z = np.cos(phi)
+        return np.stack([x, y, z], axis=1)
+
+    def __calculate_normal_vectors(self, v1: np.ndarray, v2: np.ndarray, v3: np.ndarray) -> np.ndarray:
+        normals = np.cross(v2 - v1, v3 - v1)
+        lengths = np.sqrt(np.sum(normals ** 2, axis=1))
+        degenerate = lengths == 0
+        normals[degenerate] = 0
+        lengths[degenerate] = 1
+        return normals / lengths[:, None]
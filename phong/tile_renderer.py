@@ -0,0 +1,96 @@
+import numpy as np
+import pygame
+from multiprocessing import Pool
+from multiprocessing.shared_memory import SharedMemory
+from pygame import Surface
+from scene import Scene, Sphere
+from instrumentation import Instrumentation
+from shading import calculate_intensities
+
+DEFAULT_TILE_SIZE = 64
+
+_shared_memory: SharedMemory = None
+_shared_frame: np.ndarray = None
+
+def shade_tile(frame: np.ndarray, scene: Scene, screen_center: tuple[float, float], tile: tuple[int, int, int, int]) -> None:
+    left, top, right, bottom = tile
+    tile_frame = np.zeros((right - left, bottom - top, 3), dtype=np.uint8)
+    spheres = [sphere for sphere in scene.spheres if _overlaps_tile(sphere, screen_center, tile)]
+    if spheres:
+        pixel_x, pixel_y = np.meshgrid(np.arange(left, right, dtype=np.float64), np.arange(top, bottom, dtype=np.float64), indexing='ij')
+        nearest_depths = np.full(pixel_x.shape, -np.inf)
+        nearest_spheres = np.full(pixel_x.shape, -1)
+        for i, sphere in enumerate(spheres):
+            _, _, depth_squared = _sphere_offsets(sphere, screen_center, pixel_x, pixel_y)
+            depths = sphere.center[2] + np.sqrt(np.maximum(depth_squared, 0))
+            closer = (depth_squared >= 0) & (depths > nearest_depths)
+            nearest_depths[closer] = depths[closer]
+            nearest_spheres[closer] = i
+
+        for i, sphere in enumerate(spheres):
+            covered = nearest_spheres == i
+            if not covered.any():
+                continue
+            offset_x, offset_y, depth_squared = _sphere_offsets(sphere, screen_center, pixel_x[covered], pixel_y[covered])
+            normals = np.stack([-offset_x, -offset_y, np.sqrt(depth_squared)], axis=1) / sphere.radius
+            intensities = calculate_intensities(normals, sphere.material, scene.light_positions)
+            tile_frame[covered] = (np.array(sphere.material.color, dtype=np.float64) * intensities[:, None]).astype(np.uint8)
+    frame[left:right, top:bottom] = tile_frame
+
+def _overlaps_tile(sphere: Sphere, screen_center: tuple[float, float], tile: tuple[int, int, int, int]) -> bool:
+    left, top, right, bottom = tile
+    center_x = screen_center[0] + sphere.center[0]
+    center_y = screen_center[1] + sphere.center[1]
+    return (center_x + sphere.radius >= left and center_x - sphere.radius < right and
+            center_y + sphere.radius >= top and center_y - sphere.radius < bottom)
+
+def _sphere_offsets(sphere: Sphere, screen_center: tuple[float, float], pixel_x: np.ndarray, pixel_y: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    offset_x = pixel_x - (screen_center[0] + sphere.center[0])
+    offset_y = pixel_y - (screen_center[1] + sphere.center[1])
+    return offset_x, offset_y, sphere.radius ** 2 - offset_x ** 2 - offset_y ** 2
+
+def _attach_shared_frame(name: str, shape: tuple[int, int, int]) -> None:
+    global _shared_memory, _shared_frame
+    _shared_memory = SharedMemory(name)
+    _shared_frame = np.ndarray(shape, dtype=np.uint8, buffer=_shared_memory.buf)
+
+def _shade_shared_tile(scene: Scene, screen_center: tuple[float, float], tile: tuple[int, int, int, int]) -> None:
+    shade_tile(_shared_frame, scene, screen_center, tile)
+
+class TileRenderer:
+    def __init__(self, width: int, height: int, tile_size: int = DEFAULT_TILE_SIZE, processes: int = None,
+                 instrumentation: Instrumentation = None) -> None:
+        self.width = width
+        self.height = height
+        self.screen_center = (width // 2, height // 2)
+        self.tiles = [(left, top, min(left + tile_size, width), min(top + tile_size, height))
+                      for left in range(0, width, tile_size) for top in range(0, height, tile_size)]
+        self.instrumentation = instrumentation if instrumentation is not None else Instrumentation()
+        shape = (width, height, 3)
+        self.__shared_memory = SharedMemory(create=True, size=width * height * 3)
+        self.frame = np.ndarray(shape, dtype=np.uint8, buffer=self.__shared_memory.buf)
+        self.frame[:] = 0
+        self.processes = processes
+        self.__pool = None
+        if processes != 1:
+            self.__pool = Pool(processes, initializer=_attach_shared_frame, initargs=(self.__shared_memory.name, shape))
+
+    def render(self, screen: Surface, scene: Scene) -> None:
+        with self.instrumentation.stage('shading'):
+            if self.__pool is None:
+                for tile in self.tiles:
+                    shade_tile(self.frame, scene, self.screen_center, tile)
+            else:
+                self.__pool.starmap(_shade_shared_tile, [(scene, self.screen_center, tile) for tile in self.tiles])
+            self.instrumentation.count('tiles', len(self.tiles))
+        with self.instrumentation.stage('drawing'):
+            pygame.surfarray.blit_array(screen, self.frame)
+
+    def close(self) -> None:
+        if self.__pool is not None:
+            self.__pool.close()
+            self.__pool.join()
+            self.__pool = None
+        del self.frame
+        self.__shared_memory.close()
+        self.__shared_memory.unlink()
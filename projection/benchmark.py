@@ -0,0 +1,164 @@
+import os
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+import sys
+import shared_path
+import json
+import time
+import argparse
+from typing import TextIO
+import tracemalloc
+from math import radians
+from pygame import Surface
+from file_reader import FileReader, create_scene
+from bsp_tree import BSPTree, SEQUENTIAL_STRATEGY, SAMPLED_STRATEGY
+from camera import Camera
+from frame_pipeline import FramePipeline
+from instrumentation import Instrumentation
+from binary_io import file_digest
+from potentially_visible_set import PotentiallyVisibleSet, pvs_path
+from vertex_buffer import VertexBuffer
+from chunk_index import ChunkIndex
+from chunk_streamer import ChunkStreamer, DEFAULT_MEMORY_BUDGET
+from main import BLACK, WIDTH, HEIGHT, SCENE_FILENAME
+
+FOV = radians(45)
+NEAR = 0.01
+FAR = 1000
+CAMERA_PATHS = {
+    'orbit': ['rotate_y_positive'],
+    'fly': ['move_forward', 'move_forward', 'rotate_y_positive', 'move_left', 'move_forward', 'rotate_x_negative'],
+    'inspect': ['move_backward', 'rotate_x_positive', 'zoom_in', 'rotate_z_negative', 'zoom_out', 'rotate_x_negative', 'move_right', 'move_up'],
+    'wireframe': ['toggle_occlusion', 'rotate_y_positive', 'move_forward']
+}
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless benchmark of the projection renderer")
+    parser.add_argument('--scene', default=SCENE_FILENAME)
+    parser.add_argument('--path', choices=sorted(CAMERA_PATHS), default='fly')
+    parser.add_argument('--frames', type=int, default=300)
+    parser.add_argument('--strategy', choices=[SEQUENTIAL_STRATEGY, SAMPLED_STRATEGY], default=SAMPLED_STRATEGY)
+    parser.add_argument('--width', type=int, default=WIDTH)
+    parser.add_argument('--height', type=int, default=HEIGHT)
+    parser.add_argument('--back-face-culling', action='store_true')
+    parser.add_argument('--pipelined', action='store_true', help="prepare the next frame on a worker thread while drawing the current one")
+    parser.add_argument('--chunks', help="stream the scene from this chunk directory instead of loading --scene")
+    parser.add_argument('--memory-budget', type=float, default=DEFAULT_MEMORY_BUDGET / (1 << 20), help="resident chunk budget in MiB")
+    parser.add_argument('--view-distance', type=float)
+    parser.add_argument('--no-prefetch', action='store_true')
+    parser.add_argument('--pvs', action='store_true', help="restrict traversal to the potentially visible sets precomputed for --scene")
+    parser.add_argument('--trace-memory', action='store_true', help="report peak memory of building and holding the BSP tree")
+    parser.add_argument('--export-stats', help="append periodic JSON-lines instrumentation records to this file")
+    parser.add_argument('--output', help="write the JSON report to this file instead of stdout")
+    arguments = parser.parse_args()
+
+    instrumentation = Instrumentation(record_frames=True, export_filename=arguments.export_stats)
+    chunk_streamer = None
+    if arguments.chunks:
+        chunk_streamer = ChunkStreamer(ChunkIndex.read(arguments.chunks), int(arguments.memory_budget * (1 << 20)),
+                                       arguments.view_distance, prefetch=not arguments.no_prefetch)
+        bsp_tree = None
+        camera = Camera(VertexBuffer(), [], FOV, NEAR, FAR, arguments.width, arguments.height,
+                        instrumentation=instrumentation, chunk_streamer=chunk_streamer)
+    else:
+        if arguments.trace_memory:
+            tracemalloc.start()
+        read_start = time.perf_counter()
+        scene_arrays = FileReader(arguments.scene).read_arrays()
+        create_start = time.perf_counter()
+        vertex_buffer, polygons = create_scene(*scene_arrays)
+        create_time = time.perf_counter() - create_start
+        read_time = create_start - read_start
+        if arguments.trace_memory:
+            scene_memory = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        build_start = time.perf_counter()
+        bsp_tree = BSPTree(polygons, arguments.strategy)
+        build_time = time.perf_counter() - build_start
+        if arguments.trace_memory:
+            tree_memory, build_peak_memory = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        potentially_visible_set = None
+        if arguments.pvs:
+            potentially_visible_set = PotentiallyVisibleSet.read(pvs_path(arguments.scene), file_digest(arguments.scene))
+            if potentially_visible_set is None:
+                parser.error(f"no up-to-date potentially visible sets at {pvs_path(arguments.scene)}, run scene_pvs.py first")
+        camera = Camera(vertex_buffer, polygons, FOV, NEAR, FAR, arguments.width, arguments.height,
+                        bsp_tree=bsp_tree, instrumentation=instrumentation, potentially_visible_set=potentially_visible_set)
+    camera.back_face_culling_enabled = arguments.back_face_culling
+    screen = Surface((arguments.width, arguments.height))
+    actions = CAMERA_PATHS[arguments.path]
+    if arguments.pipelined:
+        frame_pipeline = FramePipeline(camera)
+        getattr(camera, actions[0])()
+        frame_pipeline.submit()
+        prepared_frame = frame_pipeline.take(wait=True)
+        for frame in range(1, arguments.frames + 1):
+            instrumentation.begin_frame()
+            if frame < arguments.frames:
+                getattr(camera, actions[frame % len(actions)])()
+                frame_pipeline.submit()
+            screen.fill(BLACK)
+            camera.draw_frame(screen, prepared_frame)
+            prepared_frame = frame_pipeline.take(wait=True)
+            instrumentation.end_frame()
+        frame_pipeline.close()
+    else:
+        for frame in range(arguments.frames):
+            getattr(camera, actions[frame % len(actions)])()
+            instrumentation.begin_frame()
+            screen.fill(BLACK)
+            camera.draw_scene(screen)
+            instrumentation.end_frame()
+
+    report = {
+        'renderer': 'projection',
+        'scene': arguments.scene,
+        'path': arguments.path,
+        'frames': arguments.frames,
+        'resolution': [arguments.width, arguments.height],
+        'back_face_culling': arguments.back_face_culling,
+        'pipelined': arguments.pipelined
+    }
+    if bsp_tree is not None:
+        report['load'] = {
+            'read_arrays_ms': read_time * 1000,
+            'create_scene_ms': create_time * 1000,
+            'polygon_count': len(polygons)
+        }
+        report['bsp_tree'] = {
+            'strategy': arguments.strategy,
+            'build_ms': build_time * 1000,
+            'node_count': bsp_tree.node_count,
+            'depth': bsp_tree.depth,
+            'split_count': bsp_tree.split_count,
+            'vertex_count': vertex_buffer.count
+        }
+        if arguments.trace_memory:
+            report['bsp_tree']['build_peak_mib'] = (build_peak_memory - scene_memory) / (1 << 20)
+            report['bsp_tree']['held_mib'] = (tree_memory - scene_memory) / (1 << 20)
+    if camera.potentially_visible_set is not None:
+        report['pvs'] = {
+            'cell_count': camera.potentially_visible_set.cell_count,
+            'cell_size': camera.potentially_visible_set.cell_size,
+            'average_set_size': camera.potentially_visible_set.average_set_size
+        }
+    if chunk_streamer is not None:
+        chunk_streamer.close()
+        report['chunks'] = dict(chunk_streamer.statistics, directory=arguments.chunks, chunk_count=chunk_streamer.chunk_index.chunk_count,
+                                resident_count=chunk_streamer.resident_count, resident_mib=chunk_streamer.resident_size / (1 << 20))
+    report['stages'] = instrumentation.summary()
+    report['counters'] = instrumentation.counter_summary()
+    instrumentation.flush()
+    if arguments.output:
+        with open(arguments.output, 'w') as output:
+            write_report(report, output)
+    else:
+        write_report(report, sys.stdout)
+
+def write_report(report: dict, output: TextIO) -> None:
+    json.dump(report, output, indent=2)
+    output.write('\n')
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+import os
+import hashlib
+import numpy as np
+
+HEADER_SIZE = 64
+ARRAY_ALIGNMENT = 8
+
+def padded_size(size: int) -> int:
+    return size + (-size % ARRAY_ALIGNMENT)
+
+def write_arrays(path: str, header: bytes, arrays: list[np.ndarray]) -> None:
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temporary_path = path + '.tmp'
+    with open(temporary_path, 'wb') as file:
+        file.write(header.ljust(HEADER_SIZE, b'\0'))
+        for array in arrays:
+            array = np.ascontiguousarray(array)
+            file.write(array.tobytes())
+            file.write(b'\0' * (padded_size(array.nbytes) - array.nbytes))
+    os.replace(temporary_path, path)
+
+def file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def map_file(path: str) -> np.memmap:
+    return np.memmap(path, dtype=np.uint8, mode='r')
+
+def read_array(data: np.ndarray, position: int, dtype: type, shape: tuple) -> tuple[np.ndarray, int]:
+    size = int(np.prod(shape)) * np.dtype(dtype).itemsize
+    array = data[position:position + size].view(dtype).reshape(shape)
+    return array, position + padded_size(size)
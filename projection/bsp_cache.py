@@ -0,0 +1,119 @@
+import os
+import struct
+import hashlib
+import numpy as np
+from binary_io import HEADER_SIZE, padded_size, write_arrays, file_digest, map_file, read_array
+from vertex_buffer import VertexBuffer
+from polygon import Polygon
+from bsp_tree import BSPTree, SEQUENTIAL_STRATEGY, DEFAULT_CANDIDATE_COUNT, DEFAULT_SPLIT_WEIGHT, DEFAULT_BALANCE_WEIGHT
+
+CACHE_MAGIC = b'BSPC'
+CACHE_VERSION = 2
+CACHE_EXTENSION = '.bsp'
+HEADER_FORMAT = '<4sIqqqqqq'
+DIGEST_LENGTH = 16
+
+class BSPCache:
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+
+    def load_or_build(self, scene_filename: str, vertex_buffer: VertexBuffer, polygons: list[Polygon], strategy: str = SEQUENTIAL_STRATEGY,
+                      candidate_count: int = DEFAULT_CANDIDATE_COUNT, split_weight: float = DEFAULT_SPLIT_WEIGHT,
+                      balance_weight: float = DEFAULT_BALANCE_WEIGHT, seed: int = 0) -> BSPTree:
+        parameters = (strategy, candidate_count, split_weight, balance_weight, seed)
+        cache_path = self.__cache_path(scene_filename, parameters)
+        tree = self.load(cache_path, vertex_buffer, parameters)
+        if tree is None:
+            scene_vertex_count = vertex_buffer.count
+            tree = BSPTree(polygons, *parameters)
+            self.save(cache_path, tree, vertex_buffer, scene_vertex_count)
+            self.__remove_stale_entries(scene_filename, cache_path)
+        return tree
+
+    def load(self, cache_path: str, vertex_buffer: VertexBuffer, parameters: tuple) -> BSPTree:
+        if not os.path.exists(cache_path):
+            return None
+
+        data = map_file(cache_path)
+        header = struct.unpack(HEADER_FORMAT, bytes(data[:struct.calcsize(HEADER_FORMAT)]))
+        magic, version, scene_vertex_count, added_vertex_count, node_count, index_count, depth, split_count = header
+        if magic != CACHE_MAGIC or version != CACHE_VERSION or scene_vertex_count != vertex_buffer.count:
+            return None
+        if len(data) != self.__file_size(added_vertex_count, node_count, index_count):
+            return None
+
+        position = HEADER_SIZE
+        added_vertices, position = read_array(data, position, np.float64, (added_vertex_count, 3))
+        normals, position = read_array(data, position, np.float64, (node_count, 3))
+        offsets, position = read_array(data, position, np.float64, (node_count,))
+        front_children, position = read_array(data, position, np.int64, (node_count,))
+        back_children, position = read_array(data, position, np.int64, (node_count,))
+        polygon_offsets, position = read_array(data, position, np.int64, (node_count + 1,))
+        polygon_indices, position = read_array(data, position, np.int64, (index_count,))
+        colors, position = read_array(data, position, np.uint8, (node_count, 3))
+        sources, position = read_array(data, position, np.int64, (node_count,))
+        removed, position = read_array(data, position, np.uint8, (node_count,))
+
+        vertex_buffer.extend(added_vertices)
+        bounds = polygon_offsets.tolist()
+        polygons: list[Polygon] = []
+        for i, color in enumerate(colors.tolist()):
+            polygon = Polygon(vertex_buffer, polygon_indices[bounds[i]:bounds[i + 1]])
+            polygon.set_color(tuple(color))
+            polygons.append(polygon)
+        return BSPTree.from_arrays(polygons, normals, offsets, front_children, back_children, depth, split_count, *parameters,
+                                   sources=sources, removed=removed.astype(bool))
+
+    def save(self, cache_path: str, tree: BSPTree, vertex_buffer: VertexBuffer, scene_vertex_count: int) -> None:
+        tree.compact()
+        lengths = [len(polygon.indices) for polygon in tree.polygons]
+        polygon_offsets = np.zeros(tree.node_count + 1, dtype=np.int64)
+        np.cumsum(lengths, out=polygon_offsets[1:])
+        if tree.polygons:
+            polygon_indices = np.concatenate([polygon.indices for polygon in tree.polygons]).astype(np.int64)
+        else:
+            polygon_indices = np.empty(0, dtype=np.int64)
+        colors = np.array([polygon.color for polygon in tree.polygons], dtype=np.uint8).reshape(-1, 3)
+        added_vertices = vertex_buffer.vertices[scene_vertex_count:, :3]
+
+        header = struct.pack(HEADER_FORMAT, CACHE_MAGIC, CACHE_VERSION, scene_vertex_count, len(added_vertices),
+                             tree.node_count, len(polygon_indices), tree.depth, tree.split_count)
+        arrays = [
+            added_vertices.astype(np.float64),
+            tree.normals.astype(np.float64),
+            tree.offsets.astype(np.float64),
+            tree.front_children.astype(np.int64),
+            tree.back_children.astype(np.int64),
+            polygon_offsets,
+            polygon_indices,
+            colors,
+            tree.sources.astype(np.int64),
+            tree.removed.astype(np.uint8)
+        ]
+
+        write_arrays(cache_path, header, arrays)
+
+    def __file_size(self, added_vertex_count: int, node_count: int, index_count: int) -> int:
+        sizes = [added_vertex_count * 3 * 8, node_count * 3 * 8, node_count * 8, node_count * 8, node_count * 8,
+                 (node_count + 1) * 8, index_count * 8, node_count * 3,
+                 node_count * 8, node_count]
+        return HEADER_SIZE + sum(padded_size(size) for size in sizes)
+
+    def __cache_path(self, scene_filename: str, parameters: tuple) -> str:
+        scene_digest = file_digest(scene_filename)
+        parameters_digest = hashlib.sha256(repr((CACHE_VERSION,) + parameters).encode())
+        filename = f"{self.__scene_prefix(scene_filename)}{scene_digest[:DIGEST_LENGTH]}-{parameters_digest.hexdigest()[:DIGEST_LENGTH]}{CACHE_EXTENSION}"
+        return os.path.join(self.directory, filename)
+
+    def __remove_stale_entries(self, scene_filename: str, cache_path: str) -> None:
+        prefix = self.__scene_prefix(scene_filename)
+        entry_length = len(os.path.basename(cache_path))
+        scene_digest = os.path.basename(cache_path)[len(prefix):len(prefix) + DIGEST_LENGTH]
+        for entry in os.listdir(self.directory):
+            if len(entry) != entry_length or not entry.startswith(prefix) or not entry.endswith(CACHE_EXTENSION):
+                continue
+            if entry[len(prefix):len(prefix) + DIGEST_LENGTH] != scene_digest:
+                os.remove(os.path.join(self.directory, entry))
+
+    def __scene_prefix(self, scene_filename: str) -> str:
+        return os.path.splitext(os.path.basename(scene_filename))[0] + '-'
@@ -1,7 +1,9 @@
 from polygon import Polygon
 
 class BSPNode:
-    def __init__(self, polygon: Polygon) -> None:
+    def __init__(self, polygon: Polygon, source: int = -1) -> None:
         self.polygon = polygon
+        self.source = source
+        self.plane = polygon.calculate_plane()
         self.front: BSPNode = None
         self.back: BSPNode = None
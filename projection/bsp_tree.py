@@ -1,58 +1,597 @@
+import time
+import numpy as np
 from vertex import Vertex
-from polygon import Polygon
+from plane import Plane
+from polygon import Polygon, gather_indices, calculate_bounds
+from frustum import Frustum
 from bsp_node import BSPNode
 
+NO_CHILD = -1
+SEQUENTIAL_STRATEGY = 'sequential'
+SAMPLED_STRATEGY = 'sampled'
+DEFAULT_CANDIDATE_COUNT = 16
+DEFAULT_SPLIT_WEIGHT = 8.0
+DEFAULT_BALANCE_WEIGHT = 1.0
+PLANE_EPSILON = 1e-9
+REBUILD_HEIGHT_FACTOR = 1.5
+MIN_REBUILD_SIZE = 8
+MAX_REMOVED_RATIO = 0.5
+MAX_DEAD_RATIO = 0.5
+INITIAL_NODE_CAPACITY = 16
+NODE_ARRAYS = (
+    ('normals', np.float64, (3,)),
+    ('offsets', np.float64, ()),
+    ('front_children', np.int64, ()),
+    ('back_children', np.int64, ()),
+    ('parents', np.int64, ()),
+    ('sources', np.int64, ()),
+    ('removed', np.bool_, ()),
+    ('polygon_bounds_min', np.float64, (3,)),
+    ('polygon_bounds_max', np.float64, (3,)),
+    ('subtree_bounds_min', np.float64, (3,)),
+    ('subtree_bounds_max', np.float64, (3,)),
+    ('subtree_sizes', np.int64, ()),
+    ('subtree_heights', np.int64, ()),
+    ('built_heights', np.int64, ()),
+    ('subtree_removed', np.int64, ())
+)
+
 class BSPTree:
-    def __init__(self, polygons: list[Polygon]) -> None:
-        self.root = self.__build(polygons)
+    def __init__(self, polygons: list[Polygon], strategy: str = SEQUENTIAL_STRATEGY, candidate_count: int = DEFAULT_CANDIDATE_COUNT,
+                 split_weight: float = DEFAULT_SPLIT_WEIGHT, balance_weight: float = DEFAULT_BALANCE_WEIGHT, seed: int = 0) -> None:
+        if strategy not in (SEQUENTIAL_STRATEGY, SAMPLED_STRATEGY):
+            raise ValueError(f"Unknown BSP build strategy: {strategy}")
+        self.strategy = strategy
+        self.candidate_count = candidate_count
+        self.split_weight = split_weight
+        self.balance_weight = balance_weight
+        self.seed = seed
+        self.split_count = 0
+        self.__next_source = len(polygons)
+        self.__intersections: dict[tuple[float, ...], dict[tuple[int, int], int]] = {}
+        self.__clear()
+        build_start = time.perf_counter()
+        if polygons:
+            if strategy == SAMPLED_STRATEGY:
+                root = self.__build_sampled(polygons, list(range(len(polygons))))
+            else:
+                root = self.__build(polygons)
+            self.__flatten(root)
+            self.__intersections.clear()
+        self.build_time = time.perf_counter() - build_start
+
+    @classmethod
+    def from_arrays(cls, polygons: list[Polygon], normals: np.ndarray, offsets: np.ndarray, front_children: np.ndarray, back_children: np.ndarray,
+                    depth: int, split_count: int, strategy: str = SEQUENTIAL_STRATEGY, candidate_count: int = DEFAULT_CANDIDATE_COUNT,
+                    split_weight: float = DEFAULT_SPLIT_WEIGHT, balance_weight: float = DEFAULT_BALANCE_WEIGHT, seed: int = 0,
+                    sources: np.ndarray = None, removed: np.ndarray = None) -> 'BSPTree':
+        tree = cls([], strategy, candidate_count, split_weight, balance_weight, seed)
+        if sources is None:
+            sources = np.arange(len(polygons), dtype=np.int64)
+        if removed is None:
+            removed = np.zeros(len(polygons), dtype=bool)
+        tree.__set_nodes(polygons, normals, offsets, front_children, back_children, sources, removed)
+        tree.depth = depth
+        tree.split_count = split_count
+        tree.build_time = None
+        tree.__next_source = int(sources.max()) + 1 if len(sources) else 0
+        return tree
+
+    def insert(self, polygon: Polygon) -> int:
+        source = self.__next_source
+        self.__next_source += 1
+        self.__fragments[source] = []
+        if self.node_count == 0:
+            self.__write_subtree(BSPNode(polygon, source), NO_CHILD)
+            self.depth = int(self.subtree_heights[0])
+            return source
+
+        added_nodes: list[int] = []
+        pending = [(0, polygon)]
+        while pending:
+            node, polygon = pending.pop()
+            distances = polygon.points @ self.normals[node] - self.offsets[node]
+            if distances.min() >= -PLANE_EPSILON:
+                parts = [(True, polygon)]
+            elif distances.max() <= PLANE_EPSILON:
+                parts = [(False, polygon)]
+            else:
+                front_polygon, back_polygon = self.__split_by_plane(polygon, self.polygons[node].calculate_plane())
+                self.split_count += 1
+                parts = [(False, back_polygon), (True, front_polygon)]
+            for is_front, part in parts:
+                child = self.__front_children[node] if is_front else self.__back_children[node]
+                if child == NO_CHILD:
+                    child = self.__write_subtree(BSPNode(part, source), node)[0]
+                    self.__set_child(node, is_front, child)
+                    self.__update_path(node)
+                    added_nodes.append(child)
+                else:
+                    pending.append((child, part))
+
+        self.__rebalance(added_nodes)
+        self.__intersections.clear()
+        self.__compact_if_sparse()
+        return source
 
-    def traverse(self, viewer_position: Vertex) -> list[Polygon]:
-        sorted_polygons: list[Polygon] = []
-        self.__traverse_node(self.root, viewer_position, sorted_polygons)
-        return sorted_polygons
+    def remove(self, source: int) -> None:
+        if source not in self.__fragments:
+            raise KeyError(f"Unknown BSP polygon source: {source}")
+        nodes = self.__fragments.pop(source)
+        for node in nodes:
+            self.removed[node] = True
+            self.__live[node] = False
+            self.__update_path(node)
+        self.live_count -= len(nodes)
 
-    def __traverse_node(self, node: BSPNode, viewer_position: Vertex, sorted_polygons: list[Polygon]) -> None:
-        if node is None:
+        surviving_nodes: list[int] = []
+        for node in nodes:
+            if self.node_count == 0:
+                return
+            if self.polygons[node] is not None:
+                surviving_nodes.append(self.__prune(node))
+        if self.node_count == 0:
             return
+        self.__rebalance(surviving_nodes)
+        self.__intersections.clear()
+        self.__compact_if_sparse()
 
-        plane = node.polygon.calculate_plane()
-        distance_to_plane = plane.distance_to_vertex(viewer_position)
+    def fragments(self, source: int) -> list[int]:
+        return list(self.__fragments[source])
 
-        if distance_to_plane > 0:
-            self.__traverse_node(node.front, viewer_position, sorted_polygons)
-            sorted_polygons.append(node.polygon)
-            self.__traverse_node(node.back, viewer_position, sorted_polygons)
+    def traverse(self, viewer_position: Vertex, frustum: Frustum = None, cull_back_faces: bool = False,
+                 potentially_visible: tuple[np.ndarray, np.ndarray] = None) -> list[Polygon]:
+        return [self.polygons[i] for i in self.traverse_indices(viewer_position, frustum, cull_back_faces, potentially_visible)]
+
+    def traverse_indices(self, viewer_position: Vertex, frustum: Frustum = None, cull_back_faces: bool = False,
+                         potentially_visible: tuple[np.ndarray, np.ndarray] = None) -> list[int]:
+        sorted_indices: list[int] = []
+        if self.node_count == 0:
+            return sorted_indices
+
+        viewer_behind = self.normals @ viewer_position.to_vector3() < self.offsets
+        if frustum is None and potentially_visible is None:
+            subtree_visible = self.__all_visible
+            polygon_visible = self.__live
+            if cull_back_faces:
+                polygon_visible = (~viewer_behind & ~self.removed).tolist()
         else:
-            self.__traverse_node(node.back, viewer_position, sorted_polygons)
-            sorted_polygons.append(node.polygon)
-            self.__traverse_node(node.front, viewer_position, sorted_polygons)
+            subtree_visible = np.ones(self.node_count, dtype=bool)
+            polygon_visible = ~self.removed
+            if frustum is not None:
+                subtree_visible &= ~frustum.boxes_outside(self.subtree_bounds_min, self.subtree_bounds_max)
+                polygon_visible &= ~frustum.boxes_outside(self.polygon_bounds_min, self.polygon_bounds_max)
+            if potentially_visible is not None:
+                polygon_visible &= potentially_visible[0]
+                subtree_visible &= potentially_visible[1]
+            if cull_back_faces:
+                polygon_visible &= ~viewer_behind
+            subtree_visible = subtree_visible.tolist()
+            polygon_visible = polygon_visible.tolist()
+        viewer_behind = viewer_behind.tolist()
+        front_children = self.__front_children
+        back_children = self.__back_children
+        stack = [0] if subtree_visible[0] else []
+        while stack:
+            node = stack.pop()
+            if node < 0:
+                if polygon_visible[~node]:
+                    sorted_indices.append(~node)
+                continue
+            if viewer_behind[node]:
+                first, second = front_children[node], back_children[node]
+            else:
+                first, second = back_children[node], front_children[node]
+            if second != NO_CHILD and subtree_visible[second]:
+                stack.append(second)
+            stack.append(~node)
+            if first != NO_CHILD and subtree_visible[first]:
+                stack.append(first)
+        return sorted_indices
         
+    def potentially_visible_nodes(self, sources: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        polygon_visible = np.isin(self.sources, sources) & ~self.removed
+        subtree_visible = polygon_visible.copy()
+        nodes = np.flatnonzero(polygon_visible)
+        while len(nodes):
+            parents = np.unique(self.parents[nodes])
+            parents = parents[parents != NO_CHILD]
+            nodes = parents[~subtree_visible[parents]]
+            subtree_visible[nodes] = True
+        return polygon_visible, subtree_visible
+
     def __build(self, polygons: list[Polygon]) -> BSPNode:
-        root = BSPNode(polygons[0])
-        for polygon in polygons[1:]:
-            self.__split_polygon(root, polygon)
+        root = BSPNode(polygons[0], 0)
+        for source, polygon in enumerate(polygons[1:], 1):
+            self.__split_polygon(root, polygon, source)
         return root
         
-    def __split_polygon(self, node: BSPNode, polygon: Polygon) -> None:
-        plane = node.polygon.calculate_plane()
-
-        if polygon.is_wholly_in_front(plane):
-            if node.front is None:
-                node.front = BSPNode(polygon)
+    def __split_polygon(self, root: BSPNode, polygon: Polygon, source: int) -> None:
+        pending = [(root, polygon)]
+        while pending:
+            node, polygon = pending.pop()
+            if polygon.is_wholly_in_front(node.plane):
+                if node.front is None:
+                    node.front = BSPNode(polygon, source)
+                else:
+                    pending.append((node.front, polygon))
+            elif polygon.is_wholly_behind(node.plane):
+                if node.back is None:
+                    node.back = BSPNode(polygon, source)
+                else:
+                    pending.append((node.back, polygon))
             else:
-                self.__split_polygon(node.front, polygon)
-        elif polygon.is_wholly_behind(plane):
-            if node.back is None:
-                node.back = BSPNode(polygon)
+                front_polygon, back_polygon = self.__split_by_plane(polygon, node.plane)
+                self.split_count += 1
+                if node.back is None:
+                    node.back = BSPNode(back_polygon, source)
+                else:
+                    pending.append((node.back, back_polygon))
+                if node.front is None:
+                    node.front = BSPNode(front_polygon, source)
+                else:
+                    pending.append((node.front, front_polygon))
+
+    def __build_sampled(self, polygons: list[Polygon], sources: list[int]) -> BSPNode:
+        random_generator = np.random.default_rng(self.seed)
+        root: BSPNode = None
+        pending: list[tuple[list[Polygon], list[int], BSPNode, bool]] = [(polygons, sources, None, False)]
+        while pending:
+            polygons, sources, parent, is_front = pending.pop()
+            points, offsets = self.__gather_points(polygons)
+            splitter = self.__choose_splitter(polygons, points, offsets, random_generator)
+            node = BSPNode(polygons[splitter], sources[splitter])
+            if parent is None:
+                root = node
+            elif is_front:
+                parent.front = node
             else:
-                self.__split_polygon(node.back, polygon)
+                parent.back = node
+
+            in_front, behind = self.__classify(points, offsets, node.plane)
+            front_polygons: list[Polygon] = []
+            back_polygons: list[Polygon] = []
+            front_sources: list[int] = []
+            back_sources: list[int] = []
+            for i, polygon in enumerate(polygons):
+                if i == splitter:
+                    continue
+                if in_front[i]:
+                    front_polygons.append(polygon)
+                    front_sources.append(sources[i])
+                elif behind[i]:
+                    back_polygons.append(polygon)
+                    back_sources.append(sources[i])
+                else:
+                    front_polygon, back_polygon = self.__split_by_plane(polygon, node.plane)
+                    self.split_count += 1
+                    front_polygons.append(front_polygon)
+                    front_sources.append(sources[i])
+                    back_polygons.append(back_polygon)
+                    back_sources.append(sources[i])
+
+            if back_polygons:
+                pending.append((back_polygons, back_sources, node, False))
+            if front_polygons:
+                pending.append((front_polygons, front_sources, node, True))
+        return root
+
+    def __split_by_plane(self, polygon: Polygon, plane: Plane) -> tuple[Polygon, Polygon]:
+        key = tuple(plane.normal.tolist()) + (float(plane.normal @ plane.point),)
+        return polygon.split_by_plane(plane, self.__intersections.setdefault(key, {}))
+
+    def __choose_splitter(self, polygons: list[Polygon], points: np.ndarray, offsets: np.ndarray, random_generator: np.random.Generator) -> int:
+        if len(polygons) <= 2:
+            return 0
+
+        candidate_count = min(self.candidate_count, len(polygons))
+        candidates = random_generator.choice(len(polygons), candidate_count, replace=False)
+        best_candidate = 0
+        best_cost = np.inf
+        for candidate in candidates.tolist():
+            in_front, behind = self.__classify(points, offsets, polygons[candidate].calculate_plane())
+            front_count = np.count_nonzero(in_front) - 1
+            back_count = np.count_nonzero(behind & ~in_front)
+            split_count = len(polygons) - 1 - front_count - back_count
+            cost = self.split_weight * split_count + self.balance_weight * abs(front_count - back_count)
+            if cost < best_cost:
+                best_candidate = candidate
+                best_cost = cost
+        return best_candidate
+
+    def __gather_points(self, polygons: list[Polygon]) -> tuple[np.ndarray, np.ndarray]:
+        indices, offsets = gather_indices(polygons)
+        return polygons[0].vertex_buffer.vertices[indices, :3], offsets
+
+    def __classify(self, points: np.ndarray, offsets: np.ndarray, plane: Plane) -> tuple[np.ndarray, np.ndarray]:
+        distances = (points - plane.point) @ plane.normal
+        in_front = np.minimum.reduceat(distances, offsets[:-1]) >= -PLANE_EPSILON
+        behind = np.maximum.reduceat(distances, offsets[:-1]) <= PLANE_EPSILON
+        return in_front, behind
+
+    def __flatten(self, root: BSPNode) -> None:
+        nodes: list[BSPNode] = []
+        front_children: list[int] = []
+        back_children: list[int] = []
+        stack: list[tuple[BSPNode, int, bool, int]] = [(root, NO_CHILD, False, 1)]
+        while stack:
+            node, parent, is_front, depth = stack.pop()
+            self.depth = max(self.depth, depth)
+            index = len(nodes)
+            nodes.append(node)
+            front_children.append(NO_CHILD)
+            back_children.append(NO_CHILD)
+            if parent != NO_CHILD:
+                if is_front:
+                    front_children[parent] = index
+                else:
+                    back_children[parent] = index
+            if node.back is not None:
+                stack.append((node.back, index, False, depth + 1))
+            if node.front is not None:
+                stack.append((node.front, index, True, depth + 1))
+
+        normals = np.array([node.plane.normal for node in nodes], dtype=np.float64)
+        offsets = np.einsum('ij,ij->i', normals, np.array([node.plane.point for node in nodes], dtype=np.float64))
+        self.__set_nodes([node.polygon for node in nodes], normals, offsets,
+                         np.array(front_children, dtype=np.int64), np.array(back_children, dtype=np.int64),
+                         np.array([node.source for node in nodes], dtype=np.int64), np.zeros(len(nodes), dtype=bool))
+
+    def __clear(self) -> None:
+        self.depth = 0
+        self.__set_nodes([], np.empty((0, 3)), np.empty(0), np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64),
+                         np.empty(0, dtype=np.int64), np.empty(0, dtype=bool))
+
+    def __set_nodes(self, polygons: list[Polygon], normals: np.ndarray, offsets: np.ndarray, front_children: np.ndarray, back_children: np.ndarray,
+                    sources: np.ndarray, removed: np.ndarray) -> None:
+        self.polygons = list(polygons)
+        self.node_count = len(polygons)
+        self.live_count = self.node_count - int(np.count_nonzero(removed))
+        self.dead_count = 0
+        self.__buffers = {name: np.empty((max(self.node_count, INITIAL_NODE_CAPACITY),) + shape, dtype=dtype)
+                          for name, dtype, shape in NODE_ARRAYS}
+        self.__update_views()
+        self.normals[:] = normals
+        self.offsets[:] = offsets
+        self.front_children[:] = front_children
+        self.back_children[:] = back_children
+        self.sources[:] = sources
+        self.removed[:] = removed
+        self.__front_children = self.front_children.tolist()
+        self.__back_children = self.back_children.tolist()
+        self.__all_visible = [True] * self.node_count
+        self.__live = (~self.removed).tolist()
+        self.__fragments: dict[int, list[int]] = {}
+        for node, source in enumerate(self.sources.tolist()):
+            if self.__live[node]:
+                self.__fragments.setdefault(source, []).append(node)
+        self.__calculate_subtree_data()
+
+    def __update_views(self) -> None:
+        for name, buffer in self.__buffers.items():
+            setattr(self, name, buffer[:self.node_count])
+
+    def __allocate_nodes(self, count: int) -> list[int]:
+        first = self.node_count
+        capacity = len(self.__buffers['offsets'])
+        if first + count > capacity:
+            while first + count > capacity:
+                capacity *= 2
+            for name, buffer in self.__buffers.items():
+                grown = np.empty((capacity,) + buffer.shape[1:], dtype=buffer.dtype)
+                grown[:first] = buffer[:first]
+                self.__buffers[name] = grown
+        self.node_count += count
+        self.__update_views()
+        self.polygons.extend([None] * count)
+        self.__front_children.extend([NO_CHILD] * count)
+        self.__back_children.extend([NO_CHILD] * count)
+        self.__all_visible.extend([True] * count)
+        self.__live.extend([True] * count)
+        return list(range(first, first + count))
+
+    def __write_subtree(self, root: BSPNode, parent: int, slot: int = NO_CHILD) -> list[int]:
+        nodes: list[BSPNode] = []
+        node_parents: list[int] = []
+        node_sides: list[bool] = []
+        stack: list[tuple[BSPNode, int, bool]] = [(root, NO_CHILD, False)]
+        while stack:
+            node, node_parent, is_front = stack.pop()
+            nodes.append(node)
+            node_parents.append(node_parent)
+            node_sides.append(is_front)
+            if node.back is not None:
+                stack.append((node.back, len(nodes) - 1, False))
+            if node.front is not None:
+                stack.append((node.front, len(nodes) - 1, True))
+
+        if slot == NO_CHILD:
+            indices = self.__allocate_nodes(len(nodes))
         else:
-            front_polygon, back_polygon = polygon.split_by_plane(plane)
-            if node.front is None:
-                node.front = BSPNode(front_polygon)
+            indices = [slot] + self.__allocate_nodes(len(nodes) - 1)
+        polygons = [node.polygon for node in nodes]
+        normals = np.array([node.plane.normal for node in nodes], dtype=np.float64)
+        self.normals[indices] = normals
+        self.offsets[indices] = np.einsum('ij,ij->i', normals, np.array([node.plane.point for node in nodes], dtype=np.float64))
+        self.polygon_bounds_min[indices], self.polygon_bounds_max[indices] = calculate_bounds(polygons)
+        self.removed[indices] = False
+        for i, index in enumerate(indices):
+            self.polygons[index] = polygons[i]
+            self.sources[index] = nodes[i].source
+            self.__fragments[nodes[i].source].append(index)
+            self.__live[index] = True
+            self.__set_child(index, True, NO_CHILD)
+            self.__set_child(index, False, NO_CHILD)
+            if node_parents[i] == NO_CHILD:
+                self.parents[index] = parent
             else:
-                self.__split_polygon(node.front, front_polygon)
-            if node.back is None:
-                node.back = BSPNode(back_polygon)
-            else:
-                self.__split_polygon(node.back, back_polygon)
+                self.parents[index] = indices[node_parents[i]]
+                self.__set_child(indices[node_parents[i]], node_sides[i], index)
+        self.live_count += len(indices)
+        for index in reversed(indices):
+            self.__update_node(index)
+        self.built_heights[indices] = self.subtree_heights[indices]
+        return indices
+
+    def __set_child(self, node: int, is_front: bool, child: int) -> None:
+        if is_front:
+            self.front_children[node] = child
+            self.__front_children[node] = child
+        else:
+            self.back_children[node] = child
+            self.__back_children[node] = child
+
+    def __update_node(self, node: int) -> None:
+        children = [child for child in (self.__front_children[node], self.__back_children[node]) if child != NO_CHILD]
+        bounds_min = self.polygon_bounds_min[node]
+        bounds_max = self.polygon_bounds_max[node]
+        for child in children:
+            bounds_min = np.minimum(bounds_min, self.subtree_bounds_min[child])
+            bounds_max = np.maximum(bounds_max, self.subtree_bounds_max[child])
+        self.subtree_bounds_min[node] = bounds_min
+        self.subtree_bounds_max[node] = bounds_max
+        self.subtree_sizes[node] = 1 + sum(int(self.subtree_sizes[child]) for child in children)
+        self.subtree_heights[node] = 1 + max((int(self.subtree_heights[child]) for child in children), default=0)
+        self.subtree_removed[node] = int(self.removed[node]) + sum(int(self.subtree_removed[child]) for child in children)
+
+    def __update_path(self, node: int) -> None:
+        while node != NO_CHILD:
+            self.__update_node(node)
+            node = int(self.parents[node])
+        self.depth = int(self.subtree_heights[0])
+
+    def __prune(self, node: int) -> int:
+        while not self.__live[node] and self.__front_children[node] == NO_CHILD and self.__back_children[node] == NO_CHILD:
+            parent = int(self.parents[node])
+            if parent == NO_CHILD:
+                self.__clear()
+                return NO_CHILD
+            self.__set_child(parent, self.__front_children[parent] == node, NO_CHILD)
+            self.__kill(node)
+            node = parent
+        self.__update_path(node)
+        return node
+
+    def __kill(self, node: int) -> None:
+        self.removed[node] = True
+        self.__live[node] = False
+        self.parents[node] = NO_CHILD
+        self.polygons[node] = None
+        self.dead_count += 1
+
+    def __rebalance(self, nodes: list[int]) -> None:
+        best_depth = None
+        best_node = NO_CHILD
+        for node in nodes:
+            if node == NO_CHILD or self.polygons[node] is None:
+                continue
+            path: list[int] = []
+            while node != NO_CHILD:
+                path.append(node)
+                node = int(self.parents[node])
+            for depth, ancestor in enumerate(reversed(path)):
+                if best_depth is not None and depth >= best_depth:
+                    break
+                if self.__is_unbalanced(ancestor):
+                    best_depth, best_node = depth, ancestor
+                    break
+        if best_node != NO_CHILD:
+            self.__rebuild_subtree(best_node)
+
+    def __is_unbalanced(self, node: int) -> bool:
+        size = int(self.subtree_sizes[node])
+        if size < MIN_REBUILD_SIZE:
+            return False
+        return bool(self.subtree_heights[node] > REBUILD_HEIGHT_FACTOR * self.built_heights[node] or
+                    self.subtree_removed[node] > MAX_REMOVED_RATIO * size)
+
+    def __rebuild_subtree(self, root: int) -> None:
+        subtree: list[int] = []
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            subtree.append(node)
+            for child in (self.__front_children[node], self.__back_children[node]):
+                if child != NO_CHILD:
+                    stack.append(child)
+
+        live_nodes = [node for node in subtree if self.__live[node]]
+        rebuilt_nodes = set(live_nodes)
+        polygons = [self.polygons[node] for node in live_nodes]
+        sources = self.sources[live_nodes].tolist()
+        for source in set(sources):
+            self.__fragments[source] = [node for node in self.__fragments[source] if node not in rebuilt_nodes]
+        self.live_count -= len(live_nodes)
+        parent = int(self.parents[root])
+        for node in subtree:
+            if node != root:
+                self.__kill(node)
+        if polygons:
+            self.__write_subtree(self.__build_sampled(polygons, sources), parent, root)
+        elif parent == NO_CHILD:
+            self.__clear()
+            return
+        else:
+            self.__set_child(parent, self.__front_children[parent] == root, NO_CHILD)
+            self.__kill(root)
+        self.__update_path(parent)
+
+    def compact(self) -> None:
+        if self.dead_count == 0:
+            return
+        order: list[int] = []
+        stack = [0]
+        while stack:
+            node = stack.pop()
+            order.append(node)
+            for child in (self.__back_children[node], self.__front_children[node]):
+                if child != NO_CHILD:
+                    stack.append(child)
+        new_indices = np.full(self.node_count, NO_CHILD, dtype=np.int64)
+        new_indices[order] = np.arange(len(order))
+        children = []
+        for old_children in (self.front_children[order], self.back_children[order]):
+            has_child = old_children != NO_CHILD
+            old_children[has_child] = new_indices[old_children[has_child]]
+            children.append(old_children)
+        depth = self.depth
+        self.__set_nodes([self.polygons[node] for node in order], self.normals[order], self.offsets[order], children[0], children[1],
+                         self.sources[order], self.removed[order])
+        self.depth = depth
+
+    def __compact_if_sparse(self) -> None:
+        if self.dead_count > MAX_DEAD_RATIO * self.node_count:
+            self.compact()
+
+    def __calculate_subtree_data(self) -> None:
+        self.polygon_bounds_min[:], self.polygon_bounds_max[:] = calculate_bounds(self.polygons)
+        self.subtree_bounds_min[:] = self.polygon_bounds_min
+        self.subtree_bounds_max[:] = self.polygon_bounds_max
+        self.subtree_sizes[:] = 1
+        self.subtree_heights[:] = 1
+        self.subtree_removed[:] = self.removed
+        self.built_heights[:] = 1
+        self.parents[:] = NO_CHILD
+        if not self.polygons:
+            return
+
+        for children in (self.front_children, self.back_children):
+            has_child = children != NO_CHILD
+            self.parents[children[has_child]] = np.flatnonzero(has_child)
+
+        levels = [np.array([0])]
+        while True:
+            children = np.concatenate([self.front_children[levels[-1]], self.back_children[levels[-1]]])
+            children = children[children != NO_CHILD]
+            if len(children) == 0:
+                break
+            levels.append(children)
+
+        for level in reversed(levels[1:]):
+            parents = self.parents[level]
+            np.minimum.at(self.subtree_bounds_min, parents, self.subtree_bounds_min[level])
+            np.maximum.at(self.subtree_bounds_max, parents, self.subtree_bounds_max[level])
+            np.add.at(self.subtree_sizes, parents, self.subtree_sizes[level])
+            np.add.at(self.subtree_removed, parents, self.subtree_removed[level])
+            np.maximum.at(self.subtree_heights, parents, self.subtree_heights[level] + 1)
+        self.built_heights[:] = self.subtree_heights
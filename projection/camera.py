@@ -1,18 +1,47 @@
 import numpy as np
+from itertools import groupby
 from math import tan, sin, cos
 import pygame
 from pygame import Surface
 from vertex import Vertex
-from polygon import Polygon
+from vertex_buffer import VertexBuffer
+from polygon import Polygon, gather_indices, calculate_bounds, calculate_planes
 from bsp_tree import BSPTree
+from frustum import Frustum
+from instrumentation import Instrumentation
+from zbuffer_rasterizer import ZBufferRasterizer
+from camera_state import CameraState
+from prepared_frame import PreparedFrame
+from chunk import Chunk
+from chunk_streamer import ChunkStreamer
+from potentially_visible_set import PotentiallyVisibleSet, NO_CELL
 
 MOVE_STEP = 0.1
 ROTATE_STEP = 0.1
 ZOOM_STEP = 0.1
 CAMERA_POSITION = Vertex(0, 0, 0)
+CLIP_GUARD_BAND = 2
+OCCLUSION_BSP = 'bsp'
+OCCLUSION_ZBUFFER = 'zbuffer'
+QUALITY_FULL = 'full'
+QUALITY_HALF_RESOLUTION = 'half resolution'
+QUALITY_WIREFRAME = 'wireframe'
+QUALITY_LEVELS = (QUALITY_FULL, QUALITY_HALF_RESOLUTION, QUALITY_WIREFRAME)
+LOW_RESOLUTION_SCALE = 0.5
+CLIP_PLANES = np.array([
+    [1, 0, 0, 1],
+    [-1, 0, 0, 1],
+    [0, 1, 0, 1],
+    [0, -1, 0, 1],
+    [0, 0, 1, 1],
+    [0, 0, -1, 1]
+])
 
 class Camera:
-    def __init__(self, polygons: list[Polygon], fov: float, near: float, far: float, width: int, height: int, scaling_factor: int = 100) -> None:
+    def __init__(self, vertex_buffer: VertexBuffer, polygons: list[Polygon], fov: float, near: float, far: float, width: int, height: int, scaling_factor: int = 100, bsp_tree: BSPTree = None,
+                 instrumentation: Instrumentation = None, occlusion_mode: str = OCCLUSION_BSP, chunk_streamer: ChunkStreamer = None,
+                 potentially_visible_set: PotentiallyVisibleSet = None) -> None:
+        self.vertex_buffer = vertex_buffer
         self.polygons = polygons
         self.fov = fov
         self.near = near
@@ -23,102 +52,225 @@ class Camera:
         self.aspect_ratio = width / height
         self.screen_center = [width / 2, height / 2]
         self.projection_matrix = self.__create_projection_matrix(self.aspect_ratio, fov, near, far)
+        self.view_matrix = np.identity(4)
         self.occlussion_enabled = True
-        self.bsp_tree = BSPTree(polygons)
+        self.occlusion_mode = occlusion_mode
+        self.rasterizer = ZBufferRasterizer(width, height)
+        self.quality_level = 0
+        self.__bsp_tree = bsp_tree
+        self.chunk_streamer = chunk_streamer
+        self.potentially_visible_set = potentially_visible_set
+        self.frustum_culling_enabled = True
+        self.back_face_culling_enabled = False
+        self.frame_counters = {'polygons': 0, 'culled_polygons': 0, 'clipped_polygons': 0, 'clip_vertices_created': 0, 'clip_vertices_dropped': 0}
+        self.instrumentation = instrumentation if instrumentation is not None else Instrumentation()
+        self.__polygon_bounds: tuple[np.ndarray, np.ndarray] = None
+        self.__polygon_planes: tuple[np.ndarray, np.ndarray] = None
+        self.__visible_polygons: tuple[int, np.ndarray] = (NO_CELL, None)
+        self.__visible_nodes: tuple[tuple[int, int, int], tuple[np.ndarray, np.ndarray]] = (None, None)
+        self.__low_resolution_surface: Surface = None
+        self.__low_resolution_rasterizer: ZBufferRasterizer = None
+        self.dirty = True
 
     def toggle_occlusion(self) -> None:
         self.occlussion_enabled = not self.occlussion_enabled
+        self.dirty = True
+
+    def toggle_occlusion_mode(self) -> None:
+        self.occlusion_mode = OCCLUSION_ZBUFFER if self.occlusion_mode == OCCLUSION_BSP else OCCLUSION_BSP
+        self.dirty = True
+
+    @property
+    def bsp_tree(self) -> BSPTree:
+        if self.__bsp_tree is None:
+            self.__bsp_tree = BSPTree(self.polygons)
+        return self.__bsp_tree
+
+    def toggle_frustum_culling(self) -> None:
+        self.frustum_culling_enabled = not self.frustum_culling_enabled
+        self.dirty = True
+
+    def toggle_back_face_culling(self) -> None:
+        self.back_face_culling_enabled = not self.back_face_culling_enabled
+        self.dirty = True
+
+    def set_quality_level(self, quality_level: int) -> None:
+        self.quality_level = quality_level
+        self.dirty = True
 
     def move_up(self) -> None:
-        for polygon in self.polygons:
-            for vertex in polygon.vertices:
-                vertex.y += MOVE_STEP
+        translation_matrix = self.__create_translation_matrix(0, MOVE_STEP, 0)
+        self.__apply_view_transform(translation_matrix)
 
     def move_down(self) -> None:
-        for polygon in self.polygons:
-            for vertex in polygon.vertices:
-                vertex.y -= MOVE_STEP
+        translation_matrix = self.__create_translation_matrix(0, -MOVE_STEP, 0)
+        self.__apply_view_transform(translation_matrix)
 
     def move_left(self) -> None:
-        for polygon in self.polygons:
-            for vertex in polygon.vertices:
-                vertex.x -= MOVE_STEP
+        translation_matrix = self.__create_translation_matrix(-MOVE_STEP, 0, 0)
+        self.__apply_view_transform(translation_matrix)
 
     def move_right(self) -> None:
-        for polygon in self.polygons:
-            for vertex in polygon.vertices:
-                vertex.x += MOVE_STEP
+        translation_matrix = self.__create_translation_matrix(MOVE_STEP, 0, 0)
+        self.__apply_view_transform(translation_matrix)
 
     def move_forward(self) -> None:
-        for polygon in self.polygons:
-            for vertex in polygon.vertices:
-                vertex.z -= MOVE_STEP
+        translation_matrix = self.__create_translation_matrix(0, 0, -MOVE_STEP)
+        self.__apply_view_transform(translation_matrix)
 
     def move_backward(self) -> None:
-        for polygon in self.polygons:
-            for vertex in polygon.vertices:
-                vertex.z += MOVE_STEP
+        translation_matrix = self.__create_translation_matrix(0, 0, MOVE_STEP)
+        self.__apply_view_transform(translation_matrix)
 
     def rotate_x_positive(self) -> None:
         rotation_matrix = self.__create_rotate_x_matrix(ROTATE_STEP)
-        self.__rotate_polygons(rotation_matrix)
+        self.__apply_view_transform(rotation_matrix)
 
     def rotate_x_negative(self) -> None:
         rotation_matrix = self.__create_rotate_x_matrix(-ROTATE_STEP)
-        self.__rotate_polygons(rotation_matrix)
+        self.__apply_view_transform(rotation_matrix)
 
     def rotate_y_positive(self) -> None:
         rotation_matrix = self.__create_rotate_y_matrix(ROTATE_STEP)
-        self.__rotate_polygons(rotation_matrix)
+        self.__apply_view_transform(rotation_matrix)
 
     def rotate_y_negative(self) -> None:
         rotation_matrix = self.__create_rotate_y_matrix(-ROTATE_STEP)
-        self.__rotate_polygons(rotation_matrix)
+        self.__apply_view_transform(rotation_matrix)
 
     def rotate_z_positive(self) -> None:
         rotation_matrix = self.__create_rotate_z_matrix(ROTATE_STEP)
-        self.__rotate_polygons(rotation_matrix)
+        self.__apply_view_transform(rotation_matrix)
 
     def rotate_z_negative(self) -> None:
         rotation_matrix = self.__create_rotate_z_matrix(-ROTATE_STEP)
-        self.__rotate_polygons(rotation_matrix)
+        self.__apply_view_transform(rotation_matrix)
 
     def zoom_in(self) -> None:
         self.fov -= ZOOM_STEP
         self.projection_matrix = self.__create_projection_matrix(self.aspect_ratio, self.fov, self.near, self.far)
+        self.dirty = True
 
     def zoom_out(self) -> None:
         self.fov += ZOOM_STEP
         self.projection_matrix = self.__create_projection_matrix(self.aspect_ratio, self.fov, self.near, self.far)
+        self.dirty = True
+
+    def snapshot(self) -> CameraState:
+        wireframe = self.quality_level >= QUALITY_LEVELS.index(QUALITY_WIREFRAME)
+        low_resolution = self.quality_level >= QUALITY_LEVELS.index(QUALITY_HALF_RESOLUTION)
+        return CameraState(self.view_matrix.copy(), self.projection_matrix.copy(), self.occlussion_enabled and not wireframe, self.occlusion_mode,
+                           self.frustum_culling_enabled, self.back_face_culling_enabled, LOW_RESOLUTION_SCALE if low_resolution else 1)
 
     def draw_scene(self, screen: Surface) -> None:
-        polygons_to_draw = self.polygons[:]
-        if self.occlussion_enabled:
-            polygons_to_draw = self.bsp_tree.traverse(CAMERA_POSITION)
-        for polygon in polygons_to_draw:
-            clipped_polygon = self.__clip_polygon(polygon)
-            points = []
-            for vertex in clipped_polygon.vertices:
-                if vertex is None:
-                    continue
-                point = self.__project_point(vertex)
-                self.__apply_scaling_factor(point)
-                self.__move_to_screen_center(point)
-                points.append(point)
-            self.__draw_polygon(points, screen, polygon.color)
-
-    def __rotate_polygons(self, rotation_matrix: np.ndarray) -> None:
-        for polygon in self.polygons:
-            for vertex in polygon.vertices:
-                self.__rotate_vertex(vertex, rotation_matrix)
-
-    def __rotate_vertex(self, vertex: Vertex, rotation_matrix: np.ndarray) -> None:
-        v = vertex.to_vector4()
-        rotated_v = rotation_matrix @ v
-        normalized_v = self.__normalize_vector(rotated_v)
-        vertex.x = normalized_v[0]
-        vertex.y = normalized_v[1]
-        vertex.z = normalized_v[2]
+        self.dirty = False
+        self.draw_frame(screen, self.prepare_frame(self.snapshot()))
+
+    def prepare_frame(self, state: CameraState) -> PreparedFrame:
+        timing = Instrumentation()
+        frame = PreparedFrame(state, timing.stage_times)
+        with timing.stage('traversal'):
+            frustum = self.__create_frustum(state) if state.frustum_culling_enabled else None
+            viewer_position = self.__calculate_viewer_position(state.view_matrix)
+            if self.chunk_streamer is not None:
+                polygons_to_draw, polygon_count = self.__traverse_chunks(state, viewer_position, frustum)
+            elif state.occlussion_enabled and state.occlusion_mode == OCCLUSION_BSP:
+                potentially_visible = self.__find_potentially_visible_nodes(viewer_position)
+                polygons_to_draw = self.bsp_tree.traverse(viewer_position, frustum, state.back_face_culling_enabled, potentially_visible)
+                polygon_count = self.bsp_tree.live_count
+            else:
+                potentially_visible = self.__find_potentially_visible_polygons(viewer_position)
+                polygons_to_draw = self.__cull_polygons(self.polygons, frustum, viewer_position, state.back_face_culling_enabled,
+                                                        visible=potentially_visible)
+                polygon_count = len(self.polygons)
+        frame.frame_counters['polygons'] = polygon_count
+        frame.frame_counters['culled_polygons'] = polygon_count - len(polygons_to_draw)
+        if not polygons_to_draw:
+            return frame
+
+        with timing.stage('projection'):
+            indices, offsets = gather_indices(polygons_to_draw)
+            points = self.__transform_to_view_space(self.__gather_points(polygons_to_draw, indices, offsets), state.view_matrix)
+            clip_matrix = self.__create_clip_matrix(state.projection_matrix, state.resolution_scale)
+            vectors = self.__project_points(points, clip_matrix)
+        with timing.stage('clipping'):
+            input_vertex_count = len(vectors)
+            vectors, offsets, kept_polygons, clipped_count, created_count = self.__clip_polygons(vectors, offsets)
+        with timing.stage('projection'):
+            screen_points = self.__normalize_vectors(vectors)
+            screen_center = self.__scale_screen_center(state.resolution_scale)
+            self.__scale_to_screen(screen_points, screen_center)
+            self.__move_to_screen_center(screen_points, screen_center)
+        frame.frame_counters['clipped_polygons'] = clipped_count
+        frame.frame_counters['clip_vertices_created'] = created_count
+        frame.frame_counters['clip_vertices_dropped'] = input_vertex_count + created_count - len(vectors)
+        frame.polygons = polygons_to_draw
+        frame.screen_points = screen_points
+        frame.depths = vectors[:, 3]
+        frame.offsets = offsets
+        frame.kept_polygons = kept_polygons
+        return frame
+
+    def draw_frame(self, screen: Surface, frame: PreparedFrame) -> None:
+        self.frame_counters.update(frame.frame_counters)
+        self.instrumentation.add_stage_times(frame.stage_times)
+        self.instrumentation.add_counters(frame.frame_counters)
+        if self.__bsp_tree is not None:
+            self.instrumentation.set_statistics(self.__calculate_tree_statistics(self.__bsp_tree))
+        if self.chunk_streamer is not None:
+            self.instrumentation.set_statistics(self.chunk_streamer.statistics)
+        if not frame.polygons:
+            return
+
+        state = frame.state
+        with self.instrumentation.stage('drawing'):
+            target = self.__create_render_target(screen, state.resolution_scale)
+            if state.occlussion_enabled and state.occlusion_mode == OCCLUSION_ZBUFFER:
+                rasterizer = self.rasterizer if target is screen else self.__low_resolution_rasterizer
+                self.__rasterize_polygons(frame.screen_points, frame.depths, frame.offsets, frame.kept_polygons, frame.polygons, target, rasterizer)
+            else:
+                screen_points = frame.screen_points.tolist()
+                offsets = frame.offsets.tolist()
+                for i, polygon_index in enumerate(frame.kept_polygons.tolist()):
+                    points_to_draw = screen_points[offsets[i]:offsets[i + 1]]
+                    self.__draw_polygon(points_to_draw, target, frame.polygons[polygon_index].color, state.occlussion_enabled)
+            if target is not screen:
+                pygame.transform.scale(target, screen.get_size(), screen)
+
+    def __calculate_tree_statistics(self, bsp_tree: BSPTree) -> dict[str, float]:
+        statistics = {'bsp_nodes': bsp_tree.live_count, 'bsp_depth': bsp_tree.depth, 'bsp_splits': bsp_tree.split_count}
+        if bsp_tree.build_time is not None:
+            statistics['bsp_build_ms'] = bsp_tree.build_time * 1000
+        return statistics
+
+    def __create_render_target(self, screen: Surface, resolution_scale: float) -> Surface:
+        if resolution_scale == 1:
+            return screen
+        size = (int(self.width * resolution_scale), int(self.height * resolution_scale))
+        if self.__low_resolution_surface is None or self.__low_resolution_surface.get_size() != size:
+            self.__low_resolution_surface = Surface(size)
+            self.__low_resolution_rasterizer = ZBufferRasterizer(*size)
+        pygame.transform.scale(screen, size, self.__low_resolution_surface)
+        return self.__low_resolution_surface
+
+    def __apply_view_transform(self, matrix: np.ndarray) -> None:
+        self.view_matrix = matrix @ self.view_matrix
+        self.dirty = True
+
+    def __calculate_viewer_position(self, view_matrix: np.ndarray) -> Vertex:
+        camera_position = np.linalg.inv(view_matrix) @ CAMERA_POSITION.to_vector4()
+        return Vertex(camera_position[0], camera_position[1], camera_position[2])
+
+    def __transform_to_view_space(self, points: np.ndarray, view_matrix: np.ndarray) -> np.ndarray:
+        return points @ view_matrix[:3, :3].T + view_matrix[:3, 3]
+
+    def __create_translation_matrix(self, x: float, y: float, z: float) -> np.ndarray:
+        return np.array([
+            [1, 0, 0, x],
+            [0, 1, 0, y],
+            [0, 0, 1, z],
+            [0, 0, 0, 1]
+        ])
 
     def __create_rotate_x_matrix(self, angle: float) -> np.ndarray:
         return np.array([
@@ -151,59 +303,198 @@ class Camera:
             [0, 0, - (far + near) / (far - near), (-2 * far * near) / (far - near)],
             [0, 0, -1, 0]
         ])
+
+    def __create_clip_matrix(self, projection_matrix: np.ndarray, resolution_scale: float) -> np.ndarray:
+        w_row = -projection_matrix[2]
+        depth_scale = (w_row[2] * (self.far + self.near) + 2 * w_row[3]) / (self.far - self.near)
+        depth_offset = -w_row[2] * self.near - w_row[3] - depth_scale * self.near
+        screen_center = self.__scale_screen_center(resolution_scale)
+        return np.array([
+            -projection_matrix[0] * self.scaling_factor * resolution_scale / (screen_center[0] + CLIP_GUARD_BAND),
+            -projection_matrix[1] * self.scaling_factor * resolution_scale / (screen_center[1] + CLIP_GUARD_BAND),
+            [0, 0, depth_scale, depth_offset],
+            w_row
+        ])
+
+    def __create_frustum(self, state: CameraState) -> Frustum:
+        planes = CLIP_PLANES @ self.__create_clip_matrix(state.projection_matrix, state.resolution_scale)
+        return Frustum(planes @ state.view_matrix)
+
+    def __traverse_chunks(self, state: CameraState, viewer_position: Vertex, frustum: Frustum) -> tuple[list[Polygon], int]:
+        polygons_to_draw: list[Polygon] = []
+        polygon_count = 0
+        for chunk in self.chunk_streamer.request(viewer_position, frustum):
+            if state.occlussion_enabled and state.occlusion_mode == OCCLUSION_BSP:
+                polygons_to_draw += chunk.bsp_tree.traverse(viewer_position, frustum, state.back_face_culling_enabled)
+                polygon_count += chunk.bsp_tree.live_count
+            else:
+                polygons_to_draw += self.__cull_polygons(chunk.polygons, frustum, viewer_position, state.back_face_culling_enabled, chunk)
+                polygon_count += len(chunk.polygons)
+        return polygons_to_draw, polygon_count
+
+    def __find_potentially_visible_polygons(self, viewer_position: Vertex) -> np.ndarray:
+        if self.potentially_visible_set is None:
+            return None
+        cell = self.potentially_visible_set.cell_of(viewer_position.to_vector3())
+        if cell == NO_CELL:
+            return None
+        if self.__visible_polygons[0] != cell:
+            visible = np.zeros(len(self.polygons), dtype=bool)
+            visible[self.potentially_visible_set.visible_polygons(cell)] = True
+            self.__visible_polygons = (cell, visible)
+        return self.__visible_polygons[1]
+
+    def __find_potentially_visible_nodes(self, viewer_position: Vertex) -> tuple[np.ndarray, np.ndarray]:
+        if self.potentially_visible_set is None:
+            return None
+        cell = self.potentially_visible_set.cell_of(viewer_position.to_vector3())
+        if cell == NO_CELL:
+            return None
+        key = (cell, self.bsp_tree.node_count, self.bsp_tree.live_count)
+        if self.__visible_nodes[0] != key:
+            self.__visible_nodes = (key, self.bsp_tree.potentially_visible_nodes(self.potentially_visible_set.visible_polygons(cell)))
+        return self.__visible_nodes[1]
+
+    def __cull_polygons(self, polygons: list[Polygon], frustum: Frustum, viewer_position: Vertex, cull_back_faces: bool,
+                        chunk: Chunk = None, visible: np.ndarray = None) -> list[Polygon]:
+        if frustum is None and not cull_back_faces and visible is None:
+            return polygons[:]
+        culled = np.zeros(len(polygons), dtype=bool) if visible is None else ~visible
+        if frustum is not None:
+            if chunk is not None:
+                polygon_bounds = chunk.polygon_bounds
+            else:
+                if self.__polygon_bounds is None:
+                    self.__polygon_bounds = calculate_bounds(polygons)
+                polygon_bounds = self.__polygon_bounds
+            culled |= frustum.boxes_outside(*polygon_bounds)
+        if cull_back_faces:
+            if chunk is not None:
+                polygon_planes = chunk.polygon_planes
+            else:
+                if self.__polygon_planes is None:
+                    self.__polygon_planes = calculate_planes(polygons)
+                polygon_planes = self.__polygon_planes
+            normals, offsets = polygon_planes
+            culled |= normals @ viewer_position.to_vector3() < offsets
+        return [polygon for polygon, is_culled in zip(polygons, culled.tolist()) if not is_culled]
+
+    def __gather_points(self, polygons: list[Polygon], indices: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+        if self.chunk_streamer is None:
+            return self.vertex_buffer.vertices[indices, :3]
+        points = np.empty((len(indices), 3))
+        start = 0
+        for vertex_buffer, group in groupby(polygons, key=lambda polygon: polygon.vertex_buffer):
+            end = start + sum(1 for _ in group)
+            points[offsets[start]:offsets[end]] = vertex_buffer.vertices[indices[offsets[start]:offsets[end]], :3]
+            start = end
+        return points
+
+    def __project_points(self, points: np.ndarray, clip_matrix: np.ndarray) -> np.ndarray:
+        return points @ clip_matrix[:, :3].T + clip_matrix[:, 3]
+
+    def __clip_polygons(self, vectors: np.ndarray, offsets: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray, int, int]:
+        distances = vectors @ CLIP_PLANES.T
+        inside = distances >= 0
+        polygon_starts = offsets[:-1]
+        wholly_inside = np.logical_and.reduceat(inside.all(axis=1), polygon_starts)
+        wholly_outside = np.logical_not(np.logical_or.reduceat(inside, polygon_starts)).any(axis=1)
+        kept_polygons = np.flatnonzero(~wholly_outside)
+        clipped_polygons = np.flatnonzero(~wholly_inside & ~wholly_outside)
+        if len(clipped_polygons) == 0:
+            if len(kept_polygons) == len(wholly_inside):
+                return vectors, offsets, kept_polygons, 0, 0
+            return self.__select_polygons(vectors, offsets, kept_polygons) + (kept_polygons, 0, 0)
+
+        clipped_vectors, clipped_offsets = self.__select_polygons(vectors, offsets, clipped_polygons)
+        created_count = 0
+        for plane in CLIP_PLANES:
+            clipped_vectors, clipped_offsets, plane_created_count = self.__clip_against_plane(clipped_vectors, clipped_offsets, plane)
+            created_count += plane_created_count
+
+        clipped_lengths = np.diff(clipped_offsets)
+        lengths = np.diff(offsets)
+        lengths[clipped_polygons] = clipped_lengths
+        is_clipped = np.zeros(len(lengths), dtype=bool)
+        is_clipped[clipped_polygons] = True
+        kept_polygons = kept_polygons[lengths[kept_polygons] >= 3]
+
+        kept_lengths = lengths[kept_polygons]
+        kept_offsets = np.zeros(len(kept_polygons) + 1, dtype=np.int64)
+        np.cumsum(kept_lengths, out=kept_offsets[1:])
+        kept_vectors = np.empty((kept_offsets[-1], 4))
+        unclipped_polygons = kept_polygons[~is_clipped[kept_polygons]]
+        unclipped_vectors, _ = self.__select_polygons(vectors, offsets, unclipped_polygons)
+        kept_vectors[self.__polygon_ranges(kept_offsets, np.flatnonzero(~is_clipped[kept_polygons]))] = unclipped_vectors
+        clipped_position = np.zeros(len(lengths), dtype=np.int64)
+        clipped_position[clipped_polygons] = np.arange(len(clipped_polygons))
+        surviving_clipped = kept_polygons[is_clipped[kept_polygons]]
+        source = self.__polygon_ranges(clipped_offsets, clipped_position[surviving_clipped])
+        kept_vectors[self.__polygon_ranges(kept_offsets, np.flatnonzero(is_clipped[kept_polygons]))] = clipped_vectors[source]
+        return kept_vectors, kept_offsets, kept_polygons, len(clipped_polygons), created_count
+
+    def __clip_against_plane(self, vectors: np.ndarray, offsets: np.ndarray, plane: np.ndarray) -> tuple[np.ndarray, np.ndarray, int]:
+        lengths = np.diff(offsets)
+        non_empty = lengths > 0
+        next_vertices = np.arange(1, len(vectors) + 1)
+        next_vertices[offsets[1:][non_empty] - 1] = offsets[:-1][non_empty]
+
+        distances = vectors @ plane
+        inside = distances >= 0
+        next_inside = inside[next_vertices]
+        crossing = inside != next_inside
+        counts = next_inside.astype(np.int64) + crossing
+
+        edges = np.repeat(np.arange(len(vectors)), counts)
+        first_emitted = np.zeros(len(vectors) + 1, dtype=np.int64)
+        np.cumsum(counts, out=first_emitted[1:])
+        is_intersection = crossing[edges] & (np.arange(len(edges)) == first_emitted[edges])
+
+        clipped_vectors = vectors[next_vertices[edges]]
+        intersection_edges = edges[is_intersection]
+        start_distances = distances[intersection_edges]
+        end_distances = distances[next_vertices[intersection_edges]]
+        t = (start_distances / (start_distances - end_distances))[:, None]
+        start_vectors = vectors[intersection_edges]
+        clipped_vectors[is_intersection] = start_vectors + t * (vectors[next_vertices[intersection_edges]] - start_vectors)
+        return clipped_vectors, first_emitted[offsets], len(intersection_edges)
+
+    def __select_polygons(self, vectors: np.ndarray, offsets: np.ndarray, polygons: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        lengths = offsets[polygons + 1] - offsets[polygons]
+        selected_offsets = np.zeros(len(polygons) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=selected_offsets[1:])
+        return vectors[self.__polygon_ranges(offsets, polygons)], selected_offsets
+
+    def __polygon_ranges(self, offsets: np.ndarray, polygons: np.ndarray) -> np.ndarray:
+        starts = offsets[polygons]
+        lengths = offsets[polygons + 1] - starts
+        return np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
     
-    def __clip_polygon(self, polygon: Polygon) -> Polygon:
-        clipped_vertices = []
-        for i in range(len(polygon.vertices)):
-            v1_index = i
-            v2_index = (i + 1) % len(polygon.vertices)
-            v1 = polygon.vertices[v1_index]
-            v2 = polygon.vertices[v2_index]
-            if v1.z >= self.near and v2.z >= self.near:
-                clipped_vertices.append(v2)
-            elif v1.z < self.near and v2.z < self.near:
-                continue
-            elif v1.z < self.near and v2.z >= self.near:
-                intersection_point = self.__calculate_intersection_point(v1, v2)
-                clipped_vertices.append(intersection_point)
-                clipped_vertices.append(v2)
-            elif v1.z >= self.near and v2.z < self.near:
-                intersection_point = self.__calculate_intersection_point(v1, v2)
-                clipped_vertices.append(intersection_point)
-        return Polygon(clipped_vertices)
-    
-    def __calculate_intersection_point(self, v1: Vertex, v2: Vertex) -> Vertex:
-        t = (self.near - v1.z) / (v2.z - v1.z)
-        intersection_point = [v1.x + t * (v2.x - v1.x),
-                            v1.y + t * (v2.y - v1.y),
-                            self.near]
-        return Vertex(intersection_point[0], intersection_point[1], intersection_point[2])
-
-    def __project_point(self, point: Vertex) -> np.ndarray:
-        vector = point.to_vector4()
-        projected_vector = self.projection_matrix @ vector
-        normalized_vector = self.__normalize_vector(projected_vector)
-        return self.__convert_vector_to_point(normalized_vector)
-    
-    def __normalize_vector(self, vector: np.ndarray) -> np.ndarray:
-        return vector / vector[3]
-    
-    def __convert_vector_to_point(self, vector: np.ndarray) -> np.ndarray:
-        temp_vector = vector / vector[2]
-        return temp_vector[:2]
+    def __normalize_vectors(self, vectors: np.ndarray) -> np.ndarray:
+        return vectors[:, :2] / vectors[:, 3:4]
     
-    def __apply_scaling_factor(self, point: np.ndarray) -> None:
-        point *= self.scaling_factor
+    def __scale_screen_center(self, resolution_scale: float) -> list[float]:
+        return [self.screen_center[0] * resolution_scale, self.screen_center[1] * resolution_scale]
+
+    def __scale_to_screen(self, points: np.ndarray, screen_center: list[float]) -> None:
+        points *= (screen_center[0] + CLIP_GUARD_BAND, screen_center[1] + CLIP_GUARD_BAND)
     
-    def __move_to_screen_center(self, point: np.ndarray) -> None:
-        point += self.screen_center
+    def __move_to_screen_center(self, points: np.ndarray, screen_center: list[float]) -> None:
+        points += screen_center
+
+    def __rasterize_polygons(self, screen_points: np.ndarray, depths: np.ndarray, offsets: np.ndarray, kept_polygons: np.ndarray,
+                             polygons: list[Polygon], screen: Surface, rasterizer: ZBufferRasterizer) -> None:
+        colors = np.array([polygons[i].color for i in kept_polygons.tolist()], dtype=np.uint8).reshape(-1, 3)
+        rasterizer.clear()
+        rasterizer.rasterize(screen_points, 1 / depths, offsets, np.arange(len(kept_polygons)))
+        rasterizer.draw(screen, colors)
 
-    def __draw_polygon(self, points: list[np.ndarray], screen: Surface, color: tuple[int, int, int]) -> None:
-        if len(points) < 2:
+    def __draw_polygon(self, points: list[list[float]], screen: Surface, color: tuple[int, int, int], occlussion_enabled: bool) -> None:
+        if len(points) < 3:
             return
         
         line_width = 1
-        if self.occlussion_enabled:
+        if occlussion_enabled:
             line_width = 0
 
         pygame.draw.polygon(screen, color, points, line_width)
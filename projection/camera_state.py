@@ -0,0 +1,12 @@
+import numpy as np
+
+class CameraState:
+    def __init__(self, view_matrix: np.ndarray, projection_matrix: np.ndarray, occlussion_enabled: bool, occlusion_mode: str,
+                 frustum_culling_enabled: bool, back_face_culling_enabled: bool, resolution_scale: float = 1) -> None:
+        self.view_matrix = view_matrix
+        self.projection_matrix = projection_matrix
+        self.occlussion_enabled = occlussion_enabled
+        self.occlusion_mode = occlusion_mode
+        self.frustum_culling_enabled = frustum_culling_enabled
+        self.back_face_culling_enabled = back_face_culling_enabled
+        self.resolution_scale = resolution_scale
@@ -0,0 +1,26 @@
+import numpy as np
+from vertex_buffer import VertexBuffer
+from polygon import calculate_bounds, calculate_planes
+from bsp_tree import BSPTree
+
+class Chunk:
+    def __init__(self, index: int, vertex_buffer: VertexBuffer, bsp_tree: BSPTree, size: int) -> None:
+        self.index = index
+        self.vertex_buffer = vertex_buffer
+        self.bsp_tree = bsp_tree
+        self.size = size
+        self.polygons = bsp_tree.polygons
+        self.__polygon_bounds: tuple[np.ndarray, np.ndarray] = None
+        self.__polygon_planes: tuple[np.ndarray, np.ndarray] = None
+
+    @property
+    def polygon_bounds(self) -> tuple[np.ndarray, np.ndarray]:
+        if self.__polygon_bounds is None:
+            self.__polygon_bounds = calculate_bounds(self.polygons)
+        return self.__polygon_bounds
+
+    @property
+    def polygon_planes(self) -> tuple[np.ndarray, np.ndarray]:
+        if self.__polygon_planes is None:
+            self.__polygon_planes = calculate_planes(self.polygons)
+        return self.__polygon_planes
@@ -0,0 +1,81 @@
+import os
+import numpy as np
+from vertex_buffer import VertexBuffer
+from plane import Plane
+from polygon import Polygon, gather_indices
+from bsp_tree import BSPTree
+from bsp_cache import BSPCache, CACHE_EXTENSION
+from chunk_index import ChunkIndex, CHUNK_PREFIX, CHUNK_BSP_PARAMETERS
+
+DEFAULT_CHUNK_SIZE = 16.0
+CELL_EPSILON = 1e-9
+
+class ChunkBuilder:
+    def __init__(self, directory: str, chunk_size: float = DEFAULT_CHUNK_SIZE) -> None:
+        self.directory = directory
+        self.chunk_size = chunk_size
+
+    def build(self, vertex_buffer: VertexBuffer, polygons: list[Polygon]) -> ChunkIndex:
+        origin = vertex_buffer.vertices[:, :3].min(axis=0) if vertex_buffer.count else np.zeros(3)
+        cell_polygons: dict[tuple[int, int, int], list[Polygon]] = {}
+        intersections: dict[tuple[int, int], dict[tuple[int, int], int]] = {}
+        for polygon in polygons:
+            for cell, part in self.__split_into_cells(polygon, origin, intersections):
+                cell_polygons.setdefault(cell, []).append(part)
+
+        os.makedirs(self.directory, exist_ok=True)
+        self.__remove_chunk_files()
+        cells = sorted(cell_polygons)
+        chunk_index = ChunkIndex(self.directory, origin, self.chunk_size, np.array(cells, dtype=np.int64).reshape(-1, 3),
+                                 np.empty((len(cells), 3)), np.empty((len(cells), 3)), np.empty(len(cells), dtype=np.int64))
+        bsp_cache = BSPCache(self.directory)
+        for chunk, cell in enumerate(cells):
+            chunk_buffer, chunk_polygons = self.__localize(vertex_buffer, cell_polygons[cell])
+            bsp_tree = BSPTree(chunk_polygons, *CHUNK_BSP_PARAMETERS)
+            path = chunk_index.chunk_path(chunk)
+            bsp_cache.save(path, bsp_tree, chunk_buffer, 0)
+            chunk_index.bounds_min[chunk] = chunk_buffer.vertices[:, :3].min(axis=0)
+            chunk_index.bounds_max[chunk] = chunk_buffer.vertices[:, :3].max(axis=0)
+            chunk_index.sizes[chunk] = os.path.getsize(path)
+        chunk_index.write()
+        return chunk_index
+
+    def __split_into_cells(self, polygon: Polygon, origin: np.ndarray,
+                           intersections: dict[tuple[int, int], dict[tuple[int, int], int]]) -> list[tuple[tuple[int, int, int], Polygon]]:
+        parts = []
+        pending = [polygon]
+        while pending:
+            polygon = pending.pop()
+            points = polygon.points
+            first_cells = np.floor((points.min(axis=0) - origin) / self.chunk_size + CELL_EPSILON)
+            last_cells = np.ceil((points.max(axis=0) - origin) / self.chunk_size - CELL_EPSILON) - 1
+            spans = last_cells - first_cells
+            axis = int(np.argmax(spans))
+            if spans[axis] <= 0:
+                cell = np.floor((points.mean(axis=0) - origin) / self.chunk_size).astype(np.int64)
+                parts.append((tuple(cell.tolist()), polygon))
+                continue
+            normal = np.zeros(3)
+            normal[axis] = 1
+            boundary = int(first_cells[axis]) + 1
+            plane_point = origin + normal * boundary * self.chunk_size
+            front_polygon, back_polygon = polygon.split_by_plane(Plane(plane_point, normal), intersections.setdefault((axis, boundary), {}))
+            pending.extend(part for part in (front_polygon, back_polygon) if len(part.indices) >= 3)
+        return parts
+
+    def __localize(self, vertex_buffer: VertexBuffer, polygons: list[Polygon]) -> tuple[VertexBuffer, list[Polygon]]:
+        indices, offsets = gather_indices(polygons)
+        used_indices, local_indices = np.unique(indices, return_inverse=True)
+        chunk_buffer = VertexBuffer(vertex_buffer.vertices[used_indices, :3])
+        bounds = offsets.tolist()
+        chunk_polygons: list[Polygon] = []
+        for i, polygon in enumerate(polygons):
+            chunk_polygon = Polygon(chunk_buffer, local_indices[bounds[i]:bounds[i + 1]])
+            chunk_polygon.set_color(polygon.color)
+            chunk_polygons.append(chunk_polygon)
+        return chunk_buffer, chunk_polygons
+
+    def __remove_chunk_files(self) -> None:
+        for entry in os.listdir(self.directory):
+            if entry.startswith(CHUNK_PREFIX) and entry.endswith(CACHE_EXTENSION):
+                os.remove(os.path.join(self.directory, entry))
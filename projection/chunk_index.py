@@ -0,0 +1,72 @@
+import os
+import struct
+import numpy as np
+from binary_io import HEADER_SIZE, padded_size, write_arrays, map_file, read_array
+from vertex_buffer import VertexBuffer
+from bsp_tree import SAMPLED_STRATEGY, DEFAULT_CANDIDATE_COUNT, DEFAULT_SPLIT_WEIGHT, DEFAULT_BALANCE_WEIGHT
+from bsp_cache import BSPCache, CACHE_EXTENSION
+from chunk import Chunk
+
+CHUNK_INDEX_FILENAME = 'index.chunks'
+CHUNK_INDEX_MAGIC = b'CHNK'
+CHUNK_INDEX_VERSION = 1
+CHUNK_INDEX_HEADER_FORMAT = '<4sIqd'
+CHUNK_PREFIX = 'chunk_'
+CHUNK_BSP_PARAMETERS = (SAMPLED_STRATEGY, DEFAULT_CANDIDATE_COUNT, DEFAULT_SPLIT_WEIGHT, DEFAULT_BALANCE_WEIGHT, 0)
+
+class ChunkIndex:
+    def __init__(self, directory: str, origin: np.ndarray, chunk_size: float, cells: np.ndarray, bounds_min: np.ndarray,
+                 bounds_max: np.ndarray, sizes: np.ndarray) -> None:
+        self.directory = directory
+        self.origin = origin
+        self.chunk_size = chunk_size
+        self.cells = cells
+        self.bounds_min = bounds_min
+        self.bounds_max = bounds_max
+        self.sizes = sizes
+        self.chunk_count = len(cells)
+        self.__bsp_cache = BSPCache(directory)
+
+    @classmethod
+    def read(cls, directory: str) -> 'ChunkIndex':
+        path = os.path.join(directory, CHUNK_INDEX_FILENAME)
+        data = map_file(path)
+        magic, version, chunk_count, chunk_size = struct.unpack(
+            CHUNK_INDEX_HEADER_FORMAT, bytes(data[:struct.calcsize(CHUNK_INDEX_HEADER_FORMAT)]))
+        if magic != CHUNK_INDEX_MAGIC or version != CHUNK_INDEX_VERSION:
+            raise ValueError(f"{path} is not a version {CHUNK_INDEX_VERSION} chunk index")
+        sizes = [3 * 8, chunk_count * 3 * 8, chunk_count * 3 * 8, chunk_count * 3 * 8, chunk_count * 8]
+        if len(data) != HEADER_SIZE + sum(padded_size(size) for size in sizes):
+            raise ValueError(f"{path} is truncated")
+
+        position = HEADER_SIZE
+        origin, position = read_array(data, position, np.float64, (3,))
+        cells, position = read_array(data, position, np.int64, (chunk_count, 3))
+        bounds_min, position = read_array(data, position, np.float64, (chunk_count, 3))
+        bounds_max, position = read_array(data, position, np.float64, (chunk_count, 3))
+        chunk_sizes, position = read_array(data, position, np.int64, (chunk_count,))
+        return cls(directory, np.array(origin), chunk_size, np.array(cells), np.array(bounds_min), np.array(bounds_max), np.array(chunk_sizes))
+
+    def write(self) -> None:
+        header = struct.pack(CHUNK_INDEX_HEADER_FORMAT, CHUNK_INDEX_MAGIC, CHUNK_INDEX_VERSION, self.chunk_count, self.chunk_size)
+        write_arrays(os.path.join(self.directory, CHUNK_INDEX_FILENAME), header, [
+            np.asarray(self.origin, dtype=np.float64),
+            np.asarray(self.cells, dtype=np.int64),
+            np.asarray(self.bounds_min, dtype=np.float64),
+            np.asarray(self.bounds_max, dtype=np.float64),
+            np.asarray(self.sizes, dtype=np.int64)
+        ])
+
+    def chunk_path(self, chunk: int) -> str:
+        x, y, z = self.cells[chunk].tolist()
+        return os.path.join(self.directory, f"{CHUNK_PREFIX}{x}_{y}_{z}{CACHE_EXTENSION}")
+
+    def cell_of(self, points: np.ndarray) -> np.ndarray:
+        return np.floor((points - self.origin) / self.chunk_size).astype(np.int64)
+
+    def load_chunk(self, chunk: int) -> Chunk:
+        vertex_buffer = VertexBuffer()
+        bsp_tree = self.__bsp_cache.load(self.chunk_path(chunk), vertex_buffer, CHUNK_BSP_PARAMETERS)
+        if bsp_tree is None:
+            raise ValueError(f"{self.chunk_path(chunk)} is not a valid chunk")
+        return Chunk(chunk, vertex_buffer, bsp_tree, int(self.sizes[chunk]))
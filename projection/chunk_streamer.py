@@ -0,0 +1,143 @@
+import threading
+import numpy as np
+from collections import OrderedDict
+from vertex import Vertex
+from frustum import Frustum
+from chunk import Chunk
+from chunk_index import ChunkIndex
+
+DEFAULT_MEMORY_BUDGET = 256 << 20
+DEFAULT_PREFETCH_DISTANCE = 32.0
+DEFAULT_PREFETCH_FRAMES = 30
+
+class ChunkStreamer:
+    def __init__(self, chunk_index: ChunkIndex, memory_budget: int = DEFAULT_MEMORY_BUDGET, view_distance: float = None,
+                 prefetch_distance: float = DEFAULT_PREFETCH_DISTANCE, prefetch_frames: int = DEFAULT_PREFETCH_FRAMES,
+                 prefetch: bool = True) -> None:
+        self.chunk_index = chunk_index
+        self.memory_budget = memory_budget
+        self.view_distance = view_distance
+        self.prefetch_distance = prefetch_distance
+        self.prefetch_frames = prefetch_frames
+        self.resident_size = 0
+        self.statistics = {'loads': 0, 'prefetched': 0, 'evictions': 0}
+        self.__condition = threading.Condition()
+        self.__resident: OrderedDict[int, Chunk] = OrderedDict()
+        self.__loading: set[int] = set()
+        self.__requested: set[int] = set()
+        self.__last_position: np.ndarray = None
+        self.__prefetch_position: np.ndarray = None
+        self.__closed = False
+        self.__thread: threading.Thread = None
+        if prefetch:
+            self.__thread = threading.Thread(target=self.__prefetch_chunks, name="chunk-prefetch", daemon=True)
+            self.__thread.start()
+
+    @property
+    def resident_count(self) -> int:
+        with self.__condition:
+            return len(self.__resident)
+
+    def request(self, viewer_position: Vertex, frustum: Frustum = None) -> list[Chunk]:
+        position = viewer_position.to_vector3()
+        visible = np.ones(self.chunk_index.chunk_count, dtype=bool)
+        if self.view_distance is not None:
+            visible &= self.__distances_to_chunks(position) <= self.view_distance
+        if frustum is not None:
+            visible &= ~frustum.boxes_outside(self.chunk_index.bounds_min, self.chunk_index.bounds_max)
+        chunks = self.__order_back_to_front(np.flatnonzero(visible), position).tolist()
+
+        with self.__condition:
+            self.__requested = set(chunks)
+        resident = [self.__acquire(chunk) for chunk in chunks]
+        with self.__condition:
+            self.__evict(self.__requested)
+            if self.__last_position is not None:
+                self.__prefetch_position = position + (position - self.__last_position) * self.prefetch_frames
+                self.__condition.notify_all()
+            self.__last_position = position
+        return resident
+
+    def close(self) -> None:
+        if self.__thread is None:
+            return
+        with self.__condition:
+            self.__closed = True
+            self.__condition.notify_all()
+        self.__thread.join()
+        self.__thread = None
+
+    def __order_back_to_front(self, chunks: np.ndarray, position: np.ndarray) -> np.ndarray:
+        viewer_cell = self.chunk_index.cell_of(position)
+        distances = np.abs(self.chunk_index.cells[chunks] - viewer_cell)
+        return chunks[np.lexsort((-distances[:, 2], -distances[:, 1], -distances[:, 0]))]
+
+    def __distances_to_chunks(self, position: np.ndarray) -> np.ndarray:
+        gaps = np.maximum(np.maximum(self.chunk_index.bounds_min - position, position - self.chunk_index.bounds_max), 0)
+        return np.sqrt(np.sum(gaps ** 2, axis=1))
+
+    def __acquire(self, chunk: int) -> Chunk:
+        with self.__condition:
+            self.__condition.wait_for(lambda: chunk not in self.__loading)
+            if chunk in self.__resident:
+                self.__resident.move_to_end(chunk)
+                return self.__resident[chunk]
+            self.__loading.add(chunk)
+        return self.__load(chunk)
+
+    def __load(self, chunk: int, prefetched: bool = False) -> Chunk:
+        loaded = None
+        try:
+            loaded = self.chunk_index.load_chunk(chunk)
+        finally:
+            with self.__condition:
+                self.__loading.discard(chunk)
+                if loaded is not None:
+                    self.__resident[chunk] = loaded
+                    self.resident_size += loaded.size
+                    self.statistics['loads'] += 1
+                    self.statistics['prefetched'] += prefetched
+                self.__condition.notify_all()
+        return loaded
+
+    def __evict(self, protected: set[int]) -> None:
+        for chunk in list(self.__resident):
+            if self.resident_size <= self.memory_budget:
+                return
+            if chunk in protected:
+                continue
+            self.resident_size -= self.__resident.pop(chunk).size
+            self.statistics['evictions'] += 1
+
+    def __has_room_for(self, size: int, protected: set[int]) -> bool:
+        evictable = sum(chunk.size for index, chunk in self.__resident.items() if index not in protected)
+        return self.resident_size - evictable + size <= self.memory_budget
+
+    def __prefetch_chunks(self) -> None:
+        while True:
+            with self.__condition:
+                self.__condition.wait_for(lambda: self.__prefetch_position is not None or self.__closed)
+                if self.__closed:
+                    return
+                position, self.__prefetch_position = self.__prefetch_position, None
+
+            prefetched = set()
+            distances = self.__distances_to_chunks(position)
+            nearby = np.flatnonzero(distances <= self.prefetch_distance)
+            for chunk in nearby[np.argsort(distances[nearby], kind='stable')].tolist():
+                with self.__condition:
+                    if self.__closed or self.__prefetch_position is not None:
+                        break
+                    if chunk in self.__resident or chunk in self.__loading:
+                        continue
+                    protected = self.__requested | prefetched
+                    if not self.__has_room_for(int(self.chunk_index.sizes[chunk]), protected):
+                        break
+                    self.__loading.add(chunk)
+                try:
+                    self.__load(chunk, prefetched=True)
+                except Exception:
+                    break
+                prefetched.add(chunk)
+                with self.__condition:
+                    self.__evict(self.__requested | prefetched)
@@ -1,35 +1,83 @@
-from vertex import Vertex
+import os
+import struct
+import numpy as np
+from binary_io import HEADER_SIZE, padded_size, map_file, read_array
+from vertex_buffer import VertexBuffer
 from polygon import Polygon
 
 VERTEX_PREFIX = 'v '
 POLYGON_PREFIX = 'p '
+BINARY_SCENE_EXTENSION = '.bscene'
+BINARY_SCENE_MAGIC = b'SCNB'
+BINARY_SCENE_VERSION = 1
+BINARY_SCENE_HEADER_FORMAT = '<4sIqqq'
+
+def create_scene(vertices: np.ndarray, polygon_offsets: np.ndarray, polygon_indices: np.ndarray,
+                 colors: np.ndarray) -> tuple[VertexBuffer, list[Polygon]]:
+    vertex_buffer = VertexBuffer(vertices)
+    indices = polygon_indices.view(np.ndarray)
+    bounds = polygon_offsets.tolist()
+    polygons: list[Polygon] = []
+    for i, color in enumerate(map(tuple, colors.tolist())):
+        polygon = Polygon(vertex_buffer, indices[bounds[i]:bounds[i + 1]])
+        polygon.set_color(color)
+        polygons.append(polygon)
+    return vertex_buffer, polygons
 
 class FileReader:
     def __init__(self, filename: str) -> None:
         self.filename = filename
 
-    def read(self) -> list[Polygon]:
-        vertices: list[Vertex] = []
-        polygons: list[Polygon] = []
+    def read(self) -> tuple[VertexBuffer, list[Polygon]]:
+        return create_scene(*self.read_arrays())
+
+    def read_arrays(self) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        if os.path.splitext(self.filename)[1] == BINARY_SCENE_EXTENSION:
+            return self.__read_binary()
+        return self.__read_text()
+
+    def __read_text(self) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
         with open(self.filename, 'r') as file:
-            for line in file:
-                if line.startswith(VERTEX_PREFIX):
-                    coordinates = line.split()
-                    x = float(coordinates[1])
-                    y = float(coordinates[2])
-                    z = float(coordinates[3])
-                    vertex = Vertex(x, y, z)
-                    vertices.append(vertex)
-                elif line.startswith(POLYGON_PREFIX):
-                    indices = line.split()
-                    polygon_vertices: list[Vertex] = []
-                    raw_color = indices[1]
-                    color = tuple(map(int, raw_color.split(',')))
-                    for index in indices[2:]:
-                        i = int(index) - 1
-                        polygon_vertices.append(vertices[i])
-                    polygon = Polygon(polygon_vertices)
-                    polygon.set_color(color)
-                    polygons.append(polygon)
-        return polygons
-        
\ No newline at end of file
+            lines = file.read().splitlines()
+
+        vertex_text = ' '.join([line[len(VERTEX_PREFIX):] for line in lines if line.startswith(VERTEX_PREFIX)])
+        vertices = np.fromstring(vertex_text, dtype=np.float64, sep=' ').reshape(-1, 3)
+
+        polygon_lines = [line[len(POLYGON_PREFIX):] for line in lines if line.startswith(POLYGON_PREFIX)]
+        polygon_text = '\n'.join(polygon_lines)
+        index_counts = self.__count_tokens(polygon_text, len(polygon_lines)) - 1
+        values = np.fromstring(polygon_text.replace(',', ' '), dtype=np.int64, sep=' ')
+
+        polygon_offsets = np.zeros(len(polygon_lines) + 1, dtype=np.int64)
+        np.cumsum(index_counts, out=polygon_offsets[1:])
+        color_positions = polygon_offsets[:-1] + 3 * np.arange(len(polygon_lines))
+        is_color = np.zeros(len(values), dtype=bool)
+        is_color[(color_positions[:, None] + np.arange(3)).ravel()] = True
+        colors = values[is_color].reshape(-1, 3).astype(np.uint8)
+        polygon_indices = values[~is_color] - 1
+        return vertices, polygon_offsets, polygon_indices, colors
+
+    def __count_tokens(self, text: str, line_count: int) -> np.ndarray:
+        characters = np.frombuffer(text.encode(), dtype=np.uint8)
+        is_space = np.isin(characters, np.frombuffer(b' \t\r\n', dtype=np.uint8))
+        token_starts = ~is_space
+        token_starts[1:] &= is_space[:-1]
+        line_numbers = np.cumsum(characters == ord('\n'))
+        return np.bincount(line_numbers[token_starts], minlength=line_count)[:line_count]
+
+    def __read_binary(self) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        data = map_file(self.filename)
+        magic, version, vertex_count, polygon_count, index_count = struct.unpack(
+            BINARY_SCENE_HEADER_FORMAT, bytes(data[:struct.calcsize(BINARY_SCENE_HEADER_FORMAT)]))
+        if magic != BINARY_SCENE_MAGIC or version != BINARY_SCENE_VERSION:
+            raise ValueError(f"{self.filename} is not a version {BINARY_SCENE_VERSION} binary scene")
+        sizes = [vertex_count * 3 * 8, (polygon_count + 1) * 8, index_count * 8, polygon_count * 3]
+        if len(data) != HEADER_SIZE + sum(padded_size(size) for size in sizes):
+            raise ValueError(f"{self.filename} is truncated")
+
+        position = HEADER_SIZE
+        vertices, position = read_array(data, position, np.float64, (vertex_count, 3))
+        polygon_offsets, position = read_array(data, position, np.int64, (polygon_count + 1,))
+        polygon_indices, position = read_array(data, position, np.int64, (index_count,))
+        colors, position = read_array(data, position, np.uint8, (polygon_count, 3))
+        return vertices, polygon_offsets, polygon_indices, colors
@@ -0,0 +1,36 @@
+import os
+import struct
+import numpy as np
+from binary_io import write_arrays
+from file_reader import VERTEX_PREFIX, POLYGON_PREFIX, BINARY_SCENE_EXTENSION, BINARY_SCENE_MAGIC, BINARY_SCENE_VERSION, BINARY_SCENE_HEADER_FORMAT
+
+class FileWriter:
+    def __init__(self, filename: str) -> None:
+        self.filename = filename
+
+    def write_arrays(self, vertices: np.ndarray, polygon_offsets: np.ndarray, polygon_indices: np.ndarray, colors: np.ndarray) -> None:
+        if os.path.splitext(self.filename)[1] == BINARY_SCENE_EXTENSION:
+            self.__write_binary(vertices, polygon_offsets, polygon_indices, colors)
+        else:
+            self.__write_text(vertices, polygon_offsets, polygon_indices, colors)
+
+    def __write_text(self, vertices: np.ndarray, polygon_offsets: np.ndarray, polygon_indices: np.ndarray, colors: np.ndarray) -> None:
+        bounds = polygon_offsets.tolist()
+        indices = (np.asarray(polygon_indices) + 1).tolist()
+        with open(self.filename, 'w') as file:
+            for x, y, z in np.asarray(vertices).tolist():
+                file.write(f"{VERTEX_PREFIX}{x} {y} {z}\n")
+            file.write("\n")
+            for i, (red, green, blue) in enumerate(np.asarray(colors).tolist()):
+                polygon = ' '.join(map(str, indices[bounds[i]:bounds[i + 1]]))
+                file.write(f"{POLYGON_PREFIX}{red},{green},{blue} {polygon}\n")
+
+    def __write_binary(self, vertices: np.ndarray, polygon_offsets: np.ndarray, polygon_indices: np.ndarray, colors: np.ndarray) -> None:
+        header = struct.pack(BINARY_SCENE_HEADER_FORMAT, BINARY_SCENE_MAGIC, BINARY_SCENE_VERSION,
+                             len(vertices), len(colors), len(polygon_indices))
+        write_arrays(self.filename, header, [
+            np.asarray(vertices, dtype=np.float64),
+            np.asarray(polygon_offsets, dtype=np.int64),
+            np.asarray(polygon_indices, dtype=np.int64),
+            np.asarray(colors, dtype=np.uint8)
+        ])
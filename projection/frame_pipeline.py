@@ -0,0 +1,75 @@
+import threading
+from camera import Camera
+from camera_state import CameraState
+from prepared_frame import PreparedFrame
+
+class FramePipeline:
+    def __init__(self, camera: Camera, threaded: bool = True) -> None:
+        self.camera = camera
+        self.threaded = threaded
+        self.__condition = threading.Condition()
+        self.__submitted_state: CameraState = None
+        self.__preparing = False
+        self.__ready_frame: PreparedFrame = None
+        self.__error: Exception = None
+        self.__closed = False
+        self.__thread: threading.Thread = None
+        if threaded:
+            self.__thread = threading.Thread(target=self.__prepare_frames, name="frame-pipeline", daemon=True)
+            self.__thread.start()
+
+    @property
+    def pending(self) -> bool:
+        with self.__condition:
+            return self.__submitted_state is not None or self.__preparing or self.__ready_frame is not None
+
+    def submit(self) -> None:
+        state = self.camera.snapshot()
+        self.camera.dirty = False
+        if not self.threaded:
+            self.__ready_frame = self.camera.prepare_frame(state)
+            return
+        with self.__condition:
+            self.__submitted_state = state
+            self.__condition.notify_all()
+
+    def take(self, wait: bool = False) -> PreparedFrame:
+        with self.__condition:
+            if wait:
+                self.__condition.wait_for(lambda: self.__ready_frame is not None or self.__error is not None or
+                                          (self.__submitted_state is None and not self.__preparing))
+            if self.__error is not None:
+                error, self.__error = self.__error, None
+                raise error
+            frame, self.__ready_frame = self.__ready_frame, None
+            return frame
+
+    def close(self) -> None:
+        if self.__thread is None:
+            return
+        with self.__condition:
+            self.__closed = True
+            self.__condition.notify_all()
+        self.__thread.join()
+        self.__thread = None
+
+    def __prepare_frames(self) -> None:
+        while True:
+            with self.__condition:
+                self.__condition.wait_for(lambda: self.__submitted_state is not None or self.__closed)
+                if self.__closed:
+                    return
+                state, self.__submitted_state = self.__submitted_state, None
+                self.__preparing = True
+            frame = error = None
+            try:
+                frame = self.camera.prepare_frame(state)
+            except Exception as exception:
+                error = exception
+            with self.__condition:
+                if error is None:
+                    self.__ready_frame = frame
+                else:
+                    self.__error = error
+                self.__preparing = False
+                self.__condition.notify_all()
@@ -0,0 +1,10 @@
+import numpy as np
+
+class Frustum:
+    def __init__(self, planes: np.ndarray) -> None:
+        self.planes = planes
+
+    def boxes_outside(self, bounds_min: np.ndarray, bounds_max: np.ndarray) -> np.ndarray:
+        normals = self.planes[:, :3]
+        distances = bounds_max @ np.maximum(normals, 0).T + bounds_min @ np.minimum(normals, 0).T + self.planes[:, 3]
+        return (distances < 0).any(axis=1)
@@ -1,12 +1,15 @@
 import pygame
 from camera import Camera
+from frame_governor import FrameGovernor
 
 class KeyboardHandler:
-    def __init__(self, camera: Camera) -> None:
+    def __init__(self, camera: Camera, frame_governor: FrameGovernor = None) -> None:
         self.camera = camera
+        self.frame_governor = frame_governor
 
-    def handle_keyboard_events(self) -> None:
-        for event in pygame.event.get():
+    def handle_keyboard_events(self, block: bool = False) -> None:
+        events = [pygame.event.wait()] + pygame.event.get() if block else pygame.event.get()
+        for event in events:
             if event.type == pygame.QUIT:
                 pygame.quit()
                 exit()
@@ -44,3 +47,14 @@ class KeyboardHandler:
                     self.camera.zoom_out()
                 if event.key == pygame.K_LSHIFT:
                     self.camera.toggle_occlusion()
+                if event.key == pygame.K_c:
+                    self.camera.toggle_frustum_culling()
+                if event.key == pygame.K_o:
+                    self.camera.toggle_occlusion_mode()
+                if event.key == pygame.K_b:
+                    self.camera.toggle_back_face_culling()
+                if event.key == pygame.K_i:
+                    self.camera.instrumentation.toggle_overlay()
+                if event.key == pygame.K_g and self.frame_governor is not None:
+                    self.frame_governor.toggle()
+                    self.camera.set_quality_level(self.frame_governor.level)
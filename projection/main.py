@@ -1,12 +1,30 @@
+import shared_path
+import time
 import pygame
 from math import radians
 from file_reader import FileReader
-from camera import Camera
+from camera import Camera, QUALITY_LEVELS
+from bsp_tree import SAMPLED_STRATEGY
+from bsp_cache import BSPCache
 from keyboard_handler import KeyboardHandler
+from frame_pipeline import FramePipeline
+from frame_governor import FrameGovernor
+from instrumentation import Instrumentation
+from vertex_buffer import VertexBuffer
+from chunk_index import ChunkIndex
+from chunk_streamer import ChunkStreamer
+from binary_io import file_digest
+from potentially_visible_set import PotentiallyVisibleSet, pvs_path
 
 BLACK = (0, 0, 0)
 WIDTH, HEIGHT = 800, 800
 FPS = 60
+FRAME_BUDGET = 1 / FPS
+SCENE_FILENAME = "scene.txt"
+BSP_CACHE_DIRECTORY = ".bsp_cache"
+PIPELINED_RENDERING = True
+CHUNK_DIRECTORY = None
+STATS_EXPORT_FILENAME = None
 
 def main():
     pygame.display.set_caption("Grafika komputerowa - projekt")
@@ -15,17 +33,50 @@ def main():
     near = 0.01
     far = 1000
 
-    file_reader = FileReader("scene.txt")
-    polygons = file_reader.read()
-    camera = Camera(polygons, fov, near, far, WIDTH, HEIGHT)
-    keyboard_handler = KeyboardHandler(camera)
+    instrumentation = Instrumentation(export_filename=STATS_EXPORT_FILENAME)
+    if CHUNK_DIRECTORY is not None:
+        chunk_index = ChunkIndex.read(CHUNK_DIRECTORY)
+        print(f"Streaming {chunk_index.chunk_count} chunks from {CHUNK_DIRECTORY}")
+        camera = Camera(VertexBuffer(), [], fov, near, far, WIDTH, HEIGHT, instrumentation=instrumentation,
+                        chunk_streamer=ChunkStreamer(chunk_index))
+    else:
+        file_reader = FileReader(SCENE_FILENAME)
+        vertex_buffer, polygons = file_reader.read()
+        bsp_cache = BSPCache(BSP_CACHE_DIRECTORY)
+        bsp_tree = bsp_cache.load_or_build(SCENE_FILENAME, vertex_buffer, polygons, SAMPLED_STRATEGY)
+        print(f"BSP tree: {bsp_tree.node_count} nodes, depth {bsp_tree.depth}, {bsp_tree.split_count} splits")
+        potentially_visible_set = PotentiallyVisibleSet.read(pvs_path(SCENE_FILENAME), file_digest(SCENE_FILENAME))
+        if potentially_visible_set is not None:
+            print(f"Potentially visible sets: {potentially_visible_set.cell_count} cells, "
+                  f"{potentially_visible_set.average_set_size:.1f} polygons per cell on average")
+        camera = Camera(vertex_buffer, polygons, fov, near, far, WIDTH, HEIGHT, bsp_tree=bsp_tree, instrumentation=instrumentation,
+                        potentially_visible_set=potentially_visible_set)
+    frame_governor = FrameGovernor(QUALITY_LEVELS, FRAME_BUDGET)
+    keyboard_handler = KeyboardHandler(camera, frame_governor)
     clock = pygame.time.Clock()
+    frame_pipeline = FramePipeline(camera, PIPELINED_RENDERING)
+    frame = screen.copy()
 
     while True:
         clock.tick(FPS)
-        keyboard_handler.handle_keyboard_events()
-        screen.fill(BLACK)
-        camera.draw_scene(screen)
+        keyboard_handler.handle_keyboard_events(block=not camera.dirty and not frame_pipeline.pending)
+        if camera.dirty:
+            frame_pipeline.submit()
+        prepared_frame = frame_pipeline.take()
+        if prepared_frame is not None:
+            instrumentation.begin_frame()
+            draw_start = time.perf_counter()
+            frame.fill(BLACK)
+            camera.draw_frame(frame, prepared_frame)
+            instrumentation.end_frame()
+            prepare_time = sum(prepared_frame.stage_times.values())
+            draw_time = time.perf_counter() - draw_start
+            frame_time = max(prepare_time, draw_time) if frame_pipeline.threaded else prepare_time + draw_time
+            if frame_governor.record(frame_time):
+                camera.set_quality_level(frame_governor.level)
+        screen.blit(frame, (0, 0))
+        instrumentation.draw_overlay(screen)
+        frame_governor.draw_indicator(screen)
         pygame.display.update()
 
 if __name__ == "__main__":
@@ -1,54 +1,89 @@
 import numpy as np
-from vertex import Vertex
+from vertex_buffer import VertexBuffer
 from plane import Plane
 
 WHITE_COLOR = (255, 255, 255)
 
+def gather_indices(polygons: list['Polygon']) -> tuple[np.ndarray, np.ndarray]:
+    lengths = np.fromiter((len(polygon.indices) for polygon in polygons), dtype=np.int64, count=len(polygons))
+    offsets = np.zeros(len(polygons) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    if not polygons:
+        return np.empty(0, dtype=np.int64), offsets
+    return np.concatenate([polygon.indices for polygon in polygons]), offsets
+
+def calculate_bounds(polygons: list['Polygon']) -> tuple[np.ndarray, np.ndarray]:
+    if not polygons:
+        return np.empty((0, 3)), np.empty((0, 3))
+    indices, offsets = gather_indices(polygons)
+    points = polygons[0].vertex_buffer.vertices[indices, :3]
+    return np.minimum.reduceat(points, offsets[:-1]), np.maximum.reduceat(points, offsets[:-1])
+
+def calculate_planes(polygons: list['Polygon']) -> tuple[np.ndarray, np.ndarray]:
+    if not polygons:
+        return np.empty((0, 3)), np.empty(0)
+    indices, offsets = gather_indices(polygons)
+    points = polygons[0].vertex_buffer.vertices[indices, :3]
+    first = offsets[:-1]
+    normals = np.cross(points[first + 1] - points[first], points[first + 2] - points[first])
+    return normals, np.einsum('ij,ij->i', normals, points[first])
+
 class Polygon:
-    def __init__(self, vertices: list[Vertex]) -> None:
-        self.vertices = vertices
+    def __init__(self, vertex_buffer: VertexBuffer, indices: np.ndarray) -> None:
+        self.vertex_buffer = vertex_buffer
+        self.indices = np.asarray(indices, dtype=np.int64)
         self.color = WHITE_COLOR
 
+    @property
+    def points(self) -> np.ndarray:
+        return self.vertex_buffer.vertices[self.indices, :3]
+
     def set_color(self, color: tuple[int, int, int]) -> None:
         self.color = color
     
     def is_wholly_in_front(self, plane: Plane) -> bool:
-        for vertex in self.vertices:
-            vertex = vertex.to_vector3()
-            if np.dot(vertex - plane.point, plane.normal) < 0:
-                return False
-        return True
+        return bool(np.all(self.__distances_to_plane(plane) >= 0))
 
     def is_wholly_behind(self, plane: Plane) -> bool:
-        for vertex in self.vertices:
-            vertex = vertex.to_vector3()
-            if np.dot(vertex - plane.point, plane.normal) > 0:
-                return False
-        return True
-
-    def split_by_plane(self, plane: Plane) -> tuple['Polygon', 'Polygon']:
-        front_vertices = []
-        back_vertices = []
-        last_vertex = self.vertices[-1].to_vector3()
-        last_dot = np.dot(last_vertex - plane.point, plane.normal)
-
-        for vertex in self.vertices:
-            vertex = vertex.to_vector3()
-            dot = np.dot(vertex - plane.point, plane.normal)
+        return bool(np.all(self.__distances_to_plane(plane) <= 0))
+
+    def split_by_plane(self, plane: Plane, intersections: dict[tuple[int, int], int] = None) -> tuple['Polygon', 'Polygon']:
+        front_indices = []
+        back_indices = []
+        points = self.points
+        dots = self.__distances_to_plane(plane)
+        last_index = len(self.indices) - 1
+
+        for i in range(len(self.indices)):
+            dot = dots[i]
+            last_dot = dots[last_index]
             if dot * last_dot < 0:
-                intersection_vertex = last_vertex + (vertex - last_vertex) * (-last_dot / (dot - last_dot))
-                front_vertices.append(Vertex(intersection_vertex[0], intersection_vertex[1], intersection_vertex[2]))
-                back_vertices.append(Vertex(intersection_vertex[0], intersection_vertex[1], intersection_vertex[2]))
+                edge = tuple(sorted((int(self.indices[last_index]), int(self.indices[i]))))
+                intersection_index = intersections.get(edge) if intersections is not None else None
+                if intersection_index is None:
+                    intersection_vertex = points[last_index] + (points[i] - points[last_index]) * (-last_dot / (dot - last_dot))
+                    intersection_index = self.vertex_buffer.append(intersection_vertex[0], intersection_vertex[1], intersection_vertex[2])
+                    if intersections is not None:
+                        intersections[edge] = intersection_index
+                front_indices.append(intersection_index)
+                back_indices.append(intersection_index)
             if dot >= 0:
-                front_vertices.append(Vertex(vertex[0], vertex[1], vertex[2]))
+                front_indices.append(self.indices[i])
             if dot <= 0:
-                back_vertices.append(Vertex(vertex[0], vertex[1], vertex[2]))
-            last_vertex = vertex
-            last_dot = dot
+                back_indices.append(self.indices[i])
+            last_index = i
 
-        return Polygon(front_vertices), Polygon(back_vertices)
+        front_polygon = Polygon(self.vertex_buffer, front_indices)
+        back_polygon = Polygon(self.vertex_buffer, back_indices)
+        front_polygon.set_color(self.color)
+        back_polygon.set_color(self.color)
+        return front_polygon, back_polygon
     
     def calculate_plane(self) -> Plane:
-        plane_point = self.vertices[0].to_vector3()
-        plane_normal = np.cross(self.vertices[1].to_vector3() - plane_point, self.vertices[2].to_vector3() - plane_point)
+        points = self.points
+        plane_point = points[0]
+        plane_normal = np.cross(points[1] - plane_point, points[2] - plane_point)
         return Plane(plane_point, plane_normal)
+
+    def __distances_to_plane(self, plane: Plane) -> np.ndarray:
+        return (self.points - plane.point) @ plane.normal
@@ -0,0 +1,68 @@
+import os
+import struct
+import numpy as np
+from binary_io import HEADER_SIZE, padded_size, write_arrays, map_file, read_array
+
+PVS_MAGIC = b'PVST'
+PVS_VERSION = 1
+PVS_EXTENSION = '.pvs'
+PVS_HEADER_FORMAT = '<4sI16sqqqqd'
+DIGEST_LENGTH = 16
+NO_CELL = -1
+
+def pvs_path(scene_filename: str) -> str:
+    return os.path.splitext(scene_filename)[0] + PVS_EXTENSION
+
+class PotentiallyVisibleSet:
+    def __init__(self, scene_digest: str, origin: np.ndarray, cell_size: float, dimensions: np.ndarray, cell_offsets: np.ndarray,
+                 polygon_ids: np.ndarray) -> None:
+        self.scene_digest = scene_digest[:DIGEST_LENGTH]
+        self.origin = origin
+        self.cell_size = cell_size
+        self.dimensions = dimensions
+        self.cell_offsets = cell_offsets
+        self.polygon_ids = polygon_ids
+        self.cell_count = int(np.prod(dimensions))
+
+    @classmethod
+    def read(cls, path: str, scene_digest: str) -> 'PotentiallyVisibleSet':
+        if not os.path.exists(path):
+            return None
+
+        data = map_file(path)
+        header = struct.unpack(PVS_HEADER_FORMAT, bytes(data[:struct.calcsize(PVS_HEADER_FORMAT)]))
+        magic, version, digest, x_cells, y_cells, z_cells, id_count, cell_size = header
+        if magic != PVS_MAGIC or version != PVS_VERSION or digest.decode() != scene_digest[:DIGEST_LENGTH]:
+            return None
+        dimensions = np.array([x_cells, y_cells, z_cells], dtype=np.int64)
+        cell_count = int(np.prod(dimensions))
+        if len(data) != HEADER_SIZE + sum(padded_size(size) for size in [3 * 8, (cell_count + 1) * 8, id_count * 4]):
+            return None
+
+        position = HEADER_SIZE
+        origin, position = read_array(data, position, np.float64, (3,))
+        cell_offsets, position = read_array(data, position, np.int64, (cell_count + 1,))
+        polygon_ids, position = read_array(data, position, np.int32, (id_count,))
+        return cls(scene_digest, np.array(origin), cell_size, dimensions, np.array(cell_offsets), polygon_ids)
+
+    def write(self, path: str) -> None:
+        header = struct.pack(PVS_HEADER_FORMAT, PVS_MAGIC, PVS_VERSION, self.scene_digest.encode(), *self.dimensions.tolist(),
+                             len(self.polygon_ids), self.cell_size)
+        write_arrays(path, header, [
+            np.asarray(self.origin, dtype=np.float64),
+            np.asarray(self.cell_offsets, dtype=np.int64),
+            np.asarray(self.polygon_ids, dtype=np.int32)
+        ])
+
+    def cell_of(self, position: np.ndarray) -> int:
+        cell = np.floor((position - self.origin) / self.cell_size).astype(np.int64)
+        if np.any(cell < 0) or np.any(cell >= self.dimensions):
+            return NO_CELL
+        return int(np.ravel_multi_index(tuple(cell), tuple(self.dimensions)))
+
+    def visible_polygons(self, cell: int) -> np.ndarray:
+        return self.polygon_ids[self.cell_offsets[cell]:self.cell_offsets[cell + 1]]
+
+    @property
+    def average_set_size(self) -> float:
+        return len(self.polygon_ids) / self.cell_count if self.cell_count else 0.0
@@ -0,0 +1,14 @@
+import numpy as np
+from camera_state import CameraState
+from polygon import Polygon
+
+class PreparedFrame:
+    def __init__(self, state: CameraState, stage_times: dict[str, float]) -> None:
+        self.state = state
+        self.stage_times = stage_times
+        self.frame_counters = {'polygons': 0, 'culled_polygons': 0, 'clipped_polygons': 0, 'clip_vertices_created': 0, 'clip_vertices_dropped': 0}
+        self.polygons: list[Polygon] = []
+        self.screen_points = np.empty((0, 2))
+        self.depths = np.empty(0)
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self.kept_polygons = np.empty(0, dtype=np.int64)
@@ -0,0 +1,81 @@
+import numpy as np
+from math import radians, sin, cos, pi
+from vertex_buffer import VertexBuffer
+from polygon import Polygon, calculate_bounds
+from camera import Camera, OCCLUSION_ZBUFFER
+from zbuffer_rasterizer import NO_POLYGON
+from potentially_visible_set import PotentiallyVisibleSet
+
+DEFAULT_CELL_SIZE = 16.0
+DEFAULT_RESOLUTION = 256
+DEFAULT_SAMPLES_PER_AXIS = 3
+SAMPLE_FOV = radians(90)
+SAMPLE_NEAR = 0.01
+CUBE_FACE_ANGLES = ((0, 0), (0, pi / 2), (0, pi), (0, 3 * pi / 2), (pi / 2, 0), (-pi / 2, 0))
+
+class PVSBuilder:
+    def __init__(self, cell_size: float = DEFAULT_CELL_SIZE, resolution: int = DEFAULT_RESOLUTION,
+                 samples_per_axis: int = DEFAULT_SAMPLES_PER_AXIS) -> None:
+        self.cell_size = cell_size
+        self.resolution = resolution
+        self.samples_per_axis = samples_per_axis
+
+    def build(self, scene_digest: str, vertex_buffer: VertexBuffer, polygons: list[Polygon]) -> PotentiallyVisibleSet:
+        points = vertex_buffer.vertices[:, :3]
+        origin = points.min(axis=0) if vertex_buffer.count else np.zeros(3)
+        extent = points.max(axis=0) - origin if vertex_buffer.count else np.zeros(3)
+        scene_max = origin + extent
+        dimensions = np.maximum(np.ceil(extent / self.cell_size), 1).astype(np.int64)
+        far = 2 * float(np.linalg.norm(dimensions * self.cell_size))
+        camera = Camera(vertex_buffer, polygons, SAMPLE_FOV, SAMPLE_NEAR, far, self.resolution, self.resolution,
+                        scaling_factor=self.resolution / 2, occlusion_mode=OCCLUSION_ZBUFFER)
+        polygon_numbers = {id(polygon): i for i, polygon in enumerate(polygons)}
+        bounds_min, bounds_max = calculate_bounds(polygons)
+
+        cell_sets: list[np.ndarray] = []
+        for cell in range(int(np.prod(dimensions))):
+            cell_min = origin + np.array(np.unravel_index(cell, tuple(dimensions))) * self.cell_size
+            overlapping = np.flatnonzero(np.all((bounds_min <= cell_min + self.cell_size) & (bounds_max >= cell_min), axis=1))
+            visible = self.__sample_cell(camera, cell_min, np.minimum(cell_min + self.cell_size, scene_max), polygon_numbers)
+            cell_sets.append(np.union1d(overlapping, visible).astype(np.int32))
+
+        cell_offsets = np.zeros(len(cell_sets) + 1, dtype=np.int64)
+        np.cumsum([len(cell_set) for cell_set in cell_sets], out=cell_offsets[1:])
+        polygon_ids = np.concatenate(cell_sets) if cell_sets else np.empty(0, dtype=np.int32)
+        return PotentiallyVisibleSet(scene_digest, origin, self.cell_size, dimensions, cell_offsets, polygon_ids)
+
+    def __sample_cell(self, camera: Camera, cell_min: np.ndarray, cell_max: np.ndarray, polygon_numbers: dict[int, int]) -> np.ndarray:
+        visible: set[int] = set()
+        axes = [np.linspace(low, high, self.samples_per_axis) for low, high in zip(cell_min.tolist(), cell_max.tolist())]
+        for sample in np.stack(np.meshgrid(*axes, indexing='ij'), axis=-1).reshape(-1, 3):
+            for view_matrix in self.__create_view_matrices(sample):
+                camera.view_matrix = view_matrix
+                frame = camera.prepare_frame(camera.snapshot())
+                if not frame.polygons:
+                    continue
+                camera.rasterizer.clear()
+                camera.rasterizer.rasterize(frame.screen_points, 1 / frame.depths, frame.offsets, frame.kept_polygons)
+                ids = camera.rasterizer.id_buffer
+                for polygon_index in np.unique(ids[ids != NO_POLYGON]).tolist():
+                    visible.add(polygon_numbers[id(frame.polygons[polygon_index])])
+        return np.array(sorted(visible), dtype=np.int64)
+
+    def __create_view_matrices(self, position: np.ndarray) -> list[np.ndarray]:
+        translation_matrix = np.identity(4)
+        translation_matrix[:3, 3] = -position
+        view_matrices = []
+        for x_angle, y_angle in CUBE_FACE_ANGLES:
+            rotate_x_matrix = np.array([
+                [1, 0, 0, 0],
+                [0, cos(x_angle), -sin(x_angle), 0],
+                [0, sin(x_angle), cos(x_angle), 0],
+                [0, 0, 0, 1]
+            ])
+            rotate_y_matrix = np.array([
+                [cos(y_angle), 0, sin(y_angle), 0],
+                [0, 1, 0, 0],
+                [-sin(y_angle), 0, cos(y_angle), 0],
+                [0, 0, 0, 1]
+            ])
+            view_matrices.append(rotate_x_matrix @ rotate_y_matrix @ translation_matrix)
+        return view_matrices
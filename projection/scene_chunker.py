@@ -0,0 +1,16 @@
+import sys
+from file_reader import FileReader
+from chunk_builder import ChunkBuilder, DEFAULT_CHUNK_SIZE
+
+def main():
+    if len(sys.argv) not in (3, 4):
+        print(f"Usage: python {sys.argv[0]} <source scene> <chunk directory> [chunk size, default {DEFAULT_CHUNK_SIZE}]")
+        exit(1)
+
+    vertex_buffer, polygons = FileReader(sys.argv[1]).read()
+    chunk_size = float(sys.argv[3]) if len(sys.argv) == 4 else DEFAULT_CHUNK_SIZE
+    chunk_index = ChunkBuilder(sys.argv[2], chunk_size).build(vertex_buffer, polygons)
+    print(f"Wrote {chunk_index.chunk_count} chunks of size {chunk_size} to {sys.argv[2]}")
+
+if __name__ == "__main__":
+    main()
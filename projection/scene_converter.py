@@ -0,0 +1,14 @@
+import sys
+from file_reader import FileReader
+from file_writer import FileWriter
+
+def main():
+    if len(sys.argv) != 3:
+        print(f"Usage: python {sys.argv[0]} <source scene> <destination scene>")
+        exit(1)
+
+    arrays = FileReader(sys.argv[1]).read_arrays()
+    FileWriter(sys.argv[2]).write_arrays(*arrays)
+
+if __name__ == "__main__":
+    main()
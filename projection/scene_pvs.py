@@ -0,0 +1,22 @@
+import sys
+import shared_path
+from file_reader import FileReader
+from binary_io import file_digest
+from potentially_visible_set import pvs_path
+from pvs_builder import PVSBuilder, DEFAULT_CELL_SIZE, DEFAULT_RESOLUTION
+
+def main():
+    if len(sys.argv) not in (2, 3, 4):
+        print(f"Usage: python {sys.argv[0]} <scene> [cell size, default {DEFAULT_CELL_SIZE}] [sample resolution, default {DEFAULT_RESOLUTION}]")
+        exit(1)
+
+    vertex_buffer, polygons = FileReader(sys.argv[1]).read()
+    cell_size = float(sys.argv[2]) if len(sys.argv) >= 3 else DEFAULT_CELL_SIZE
+    resolution = int(sys.argv[3]) if len(sys.argv) == 4 else DEFAULT_RESOLUTION
+    potentially_visible_set = PVSBuilder(cell_size, resolution).build(file_digest(sys.argv[1]), vertex_buffer, polygons)
+    potentially_visible_set.write(pvs_path(sys.argv[1]))
+    print(f"Wrote {potentially_visible_set.cell_count} cells of size {cell_size} to {pvs_path(sys.argv[1])}, "
+          f"{potentially_visible_set.average_set_size:.1f} of {len(polygons)} polygons visible per cell on average")
+
+if __name__ == "__main__":
+    main()
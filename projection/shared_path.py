@@ -0,0 +1,7 @@
+import os
+import sys
+
+SHARED_DIRECTORY = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'shared'))
+
+if SHARED_DIRECTORY not in sys.path:
+    sys.path.insert(0, SHARED_DIRECTORY)
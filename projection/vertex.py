@@ -1,6 +1,8 @@
 import numpy as np
 
 class Vertex:
+    __slots__ = ('x', 'y', 'z', 'w')
+
     def __init__(self, x: float, y: float, z: float) -> None:
         self.x = x
         self.y = y
@@ -0,0 +1,36 @@
+import numpy as np
+
+INITIAL_CAPACITY = 64
+
+class VertexBuffer:
+    def __init__(self, vertices: np.ndarray = None) -> None:
+        if vertices is None:
+            vertices = np.empty((0, 3))
+        self.count = len(vertices)
+        self.__data = np.ones((max(self.count, INITIAL_CAPACITY), 4))
+        self.__data[:self.count, :3] = vertices
+
+    @property
+    def vertices(self) -> np.ndarray:
+        return self.__data[:self.count]
+
+    def append(self, x: float, y: float, z: float) -> int:
+        self.__reserve(self.count + 1)
+        self.__data[self.count] = (x, y, z, 1)
+        self.count += 1
+        return self.count - 1
+
+    def extend(self, points: np.ndarray) -> np.ndarray:
+        start = self.count
+        self.__reserve(start + len(points))
+        self.__data[start:start + len(points), :3] = points
+        self.__data[start:start + len(points), 3] = 1
+        self.count += len(points)
+        return np.arange(start, self.count)
+
+    def __reserve(self, capacity: int) -> None:
+        if capacity <= len(self.__data):
+            return
+        data = np.ones((max(capacity, 2 * len(self.__data)), 4))
+        data[:self.count] = self.vertices
+        self.__data = data
@@ -0,0 +1,105 @@
+import numpy as np
+import pygame
+from pygame import Surface
+
+NO_POLYGON = -1
+BATCH_PIXELS = 1 << 20
+
+class ZBufferRasterizer:
+    def __init__(self, width: int, height: int) -> None:
+        self.width = width
+        self.height = height
+        self.depth_buffer = np.zeros(width * height)
+        self.id_buffer = np.full(width * height, NO_POLYGON, dtype=np.int64)
+
+    def clear(self) -> None:
+        self.depth_buffer.fill(0)
+        self.id_buffer.fill(NO_POLYGON)
+
+    def rasterize(self, screen_points: np.ndarray, inverse_depths: np.ndarray, offsets: np.ndarray, polygon_ids: np.ndarray) -> None:
+        triangles, triangle_ids = self.__triangulate(offsets, polygon_ids)
+        if len(triangles) == 0:
+            return
+
+        corners = screen_points[triangles]
+        edge_coefficients, depth_coefficients, valid = self.__calculate_coefficients(corners, inverse_depths[triangles])
+        corners, triangle_ids = corners[valid], triangle_ids[valid]
+        edge_coefficients, depth_coefficients = edge_coefficients[valid], depth_coefficients[valid]
+
+        first_rows = np.clip(np.ceil(corners[:, :, 1].min(axis=1) - 0.5), 0, self.height).astype(np.int64)
+        last_rows = np.clip(np.floor(corners[:, :, 1].max(axis=1) - 0.5), -1, self.height - 1).astype(np.int64)
+        row_counts = np.maximum(last_rows - first_rows + 1, 0)
+        span_owners = np.repeat(np.arange(len(corners)), row_counts)
+        span_rows = first_rows[span_owners] + np.arange(len(span_owners)) - np.repeat(np.cumsum(row_counts) - row_counts, row_counts)
+        span_starts, span_lengths = self.__calculate_spans(edge_coefficients[span_owners], span_rows + 0.5)
+
+        visible = span_lengths > 0
+        span_owners, span_rows = span_owners[visible], span_rows[visible]
+        span_starts, span_lengths = span_starts[visible], span_lengths[visible]
+        cumulative_lengths = np.cumsum(span_lengths)
+        batch_start = 0
+        while batch_start < len(span_lengths):
+            consumed = cumulative_lengths[batch_start - 1] if batch_start > 0 else 0
+            batch_end = max(int(np.searchsorted(cumulative_lengths, consumed + BATCH_PIXELS, side='right')), batch_start + 1)
+            batch = slice(batch_start, batch_end)
+            self.__fill_spans(span_owners[batch], span_rows[batch], span_starts[batch], span_lengths[batch],
+                              depth_coefficients, triangle_ids)
+            batch_start = batch_end
+
+    def draw(self, screen: Surface, colors: np.ndarray) -> None:
+        covered = np.flatnonzero(self.id_buffer != NO_POLYGON)
+        pixels = pygame.surfarray.pixels3d(screen)
+        pixels[covered // self.height, covered % self.height] = colors[self.id_buffer[covered]]
+        del pixels
+
+    def __triangulate(self, offsets: np.ndarray, polygon_ids: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        triangle_counts = np.maximum(np.diff(offsets) - 2, 0)
+        owners = np.repeat(np.arange(len(triangle_counts)), triangle_counts)
+        first_triangles = np.cumsum(triangle_counts) - triangle_counts
+        fan_positions = np.arange(len(owners)) - first_triangles[owners] + 1
+        starts = offsets[owners]
+        triangles = np.stack([starts, starts + fan_positions, starts + fan_positions + 1], axis=1)
+        return triangles, polygon_ids[owners]
+
+    def __calculate_coefficients(self, corners: np.ndarray, inverse_depths: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        x, y = corners[:, :, 0], corners[:, :, 1]
+        following = [1, 2, 0]
+        preceding = [2, 0, 1]
+        edge_a = y[:, following] - y[:, preceding]
+        edge_b = x[:, preceding] - x[:, following]
+        edge_c = x[:, following] * y[:, preceding] - x[:, preceding] * y[:, following]
+        area = edge_c.sum(axis=1)
+        valid = area != 0
+        inverse_area = np.divide(1.0, area, out=np.zeros_like(area), where=valid)[:, None]
+        edge_coefficients = np.stack([edge_a, edge_b, edge_c], axis=2) * np.sign(area)[:, None, None]
+        depth_coefficients = np.stack([
+            (edge_a * inverse_depths).sum(axis=1),
+            (edge_b * inverse_depths).sum(axis=1),
+            (edge_c * inverse_depths).sum(axis=1)
+        ], axis=1) * inverse_area
+        return edge_coefficients, depth_coefficients, valid
+
+    def __calculate_spans(self, edge_coefficients: np.ndarray, sample_y: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        slopes = edge_coefficients[:, :, 0]
+        constants = edge_coefficients[:, :, 1] * sample_y[:, None] + edge_coefficients[:, :, 2]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            crossings = -constants / slopes
+        lower = np.where(slopes > 0, crossings, -np.inf).max(axis=1)
+        upper = np.where(slopes < 0, crossings, np.inf).min(axis=1)
+        blocked = ((slopes == 0) & (constants < 0)).any(axis=1)
+        starts = np.clip(np.ceil(lower - 0.5), 0, self.width)
+        ends = np.clip(np.floor(upper - 0.5), -1, self.width - 1)
+        lengths = np.where(blocked, 0, np.maximum(ends - starts + 1, 0))
+        return starts.astype(np.int64), lengths.astype(np.int64)
+
+    def __fill_spans(self, owners: np.ndarray, rows: np.ndarray, starts: np.ndarray, lengths: np.ndarray,
+                     depth_coefficients: np.ndarray, triangle_ids: np.ndarray) -> None:
+        coefficients = depth_coefficients[owners]
+        start_depths = coefficients[:, 0] * (starts + 0.5) + coefficients[:, 1] * (rows + 0.5) + coefficients[:, 2]
+        span_offsets = np.cumsum(lengths) - lengths
+        positions = np.arange(lengths.sum(), dtype=np.int32) - np.repeat(span_offsets.astype(np.int32), lengths)
+        depths = np.repeat(start_depths, lengths) + np.repeat(coefficients[:, 0], lengths) * positions
+        pixels = np.repeat((starts * self.height + rows).astype(np.int32), lengths) + positions * np.int32(self.height)
+        np.maximum.at(self.depth_buffer, pixels, depths)
+        nearest = np.flatnonzero(depths == self.depth_buffer[pixels])
+        self.id_buffer[pixels[nearest]] = np.repeat(triangle_ids[owners], lengths)[nearest]
@@ -0,0 +1,66 @@
+from collections import deque
+import pygame
+from pygame import Surface
+
+DEFAULT_WINDOW = 10
+DEFAULT_COST_RATIO = 2.0
+INDICATOR_FONT_SIZE = 20
+INDICATOR_MARGIN = 8
+INDICATOR_COLOR = (255, 255, 0)
+
+class FrameGovernor:
+    def __init__(self, levels: tuple[str, ...], budget: float, window: int = DEFAULT_WINDOW) -> None:
+        self.levels = levels
+        self.budget = budget
+        self.window = window
+        self.enabled = True
+        self.level = 0
+        self.__frame_times: deque[float] = deque(maxlen=window)
+        self.__level_times: dict[int, float] = {}
+        self.__cost_ratios: dict[int, float] = {}
+        self.__font: pygame.font.Font = None
+
+    @property
+    def quality(self) -> str:
+        return self.levels[self.level]
+
+    @property
+    def average_frame_time(self) -> float:
+        return sum(self.__frame_times) / len(self.__frame_times) if self.__frame_times else 0.0
+
+    def toggle(self) -> None:
+        self.enabled = not self.enabled
+        self.__set_level(0)
+
+    def record(self, seconds: float) -> bool:
+        self.__frame_times.append(seconds)
+        if not self.enabled or len(self.__frame_times) < self.window:
+            return False
+
+        average = self.average_frame_time
+        if self.level > 0 and self.level not in self.__cost_ratios and self.level - 1 in self.__level_times:
+            self.__cost_ratios[self.level] = self.__level_times[self.level - 1] / average
+        self.__level_times[self.level] = average
+        if average > self.budget and self.level < len(self.levels) - 1:
+            self.__set_level(self.level + 1)
+            return True
+        if self.level > 0 and average * self.__cost_ratios.get(self.level, DEFAULT_COST_RATIO) < self.budget:
+            self.__cost_ratios.pop(self.level, None)
+            self.__set_level(self.level - 1)
+            return True
+        return False
+
+    def draw_indicator(self, screen: Surface) -> None:
+        if self.__font is None:
+            pygame.font.init()
+            self.__font = pygame.font.Font(None, INDICATOR_FONT_SIZE)
+        if self.enabled:
+            text = f"quality {self.level + 1}/{len(self.levels)}: {self.quality} ({self.average_frame_time * 1000:.1f} ms)"
+        else:
+            text = f"quality governor off ({self.average_frame_time * 1000:.1f} ms)"
+        label = self.__font.render(text, True, INDICATOR_COLOR)
+        screen.blit(label, (INDICATOR_MARGIN, screen.get_height() - label.get_height() - INDICATOR_MARGIN))
+
+    def __set_level(self, level: int) -> None:
+        self.level = level
+        self.__frame_times.clear()
@@ -0,0 +1,143 @@
+import time
+import json
+from contextlib import contextmanager
+import numpy as np
+import pygame
+from pygame import Surface
+
+FRAME_STAGE = 'frame'
+PERCENTILES = (50, 90, 99)
+DEFAULT_EXPORT_INTERVAL = 1.0
+OVERLAY_FONT_SIZE = 20
+OVERLAY_MARGIN = 8
+OVERLAY_COLOR = (255, 255, 255)
+OVERLAY_BACKGROUND = (0, 0, 0, 160)
+
+class Instrumentation:
+    def __init__(self, record_frames: bool = False, export_filename: str = None, export_interval: float = DEFAULT_EXPORT_INTERVAL) -> None:
+        self.record_frames = record_frames
+        self.export_filename = export_filename
+        self.export_interval = export_interval
+        self.overlay_enabled = False
+        self.stage_times: dict[str, float] = {}
+        self.counters: dict[str, int] = {}
+        self.statistics: dict[str, float] = {}
+        self.frames: list[dict[str, float]] = []
+        self.frame_counters: list[dict[str, int]] = []
+        self.last_stage_times: dict[str, float] = {}
+        self.last_counters: dict[str, int] = {}
+        self.__frame_start = 0.0
+        self.__export_frames: list[tuple[dict[str, float], dict[str, int]]] = []
+        self.__export_start = time.perf_counter()
+        self.__font: pygame.font.Font = None
+
+    def begin_frame(self) -> None:
+        self.stage_times = {}
+        self.counters = {}
+        self.__frame_start = time.perf_counter()
+
+    def end_frame(self) -> None:
+        end = time.perf_counter()
+        self.stage_times[FRAME_STAGE] = end - self.__frame_start
+        self.last_stage_times = self.stage_times
+        self.last_counters = self.counters
+        if self.record_frames:
+            self.frames.append(self.stage_times)
+            self.frame_counters.append(self.counters)
+        if self.export_filename is not None:
+            self.__export_frames.append((self.stage_times, self.counters))
+            if end - self.__export_start >= self.export_interval:
+                self.__export(end)
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stage_times[name] = self.stage_times.get(name, 0.0) + time.perf_counter() - start
+
+    def count(self, name: str, value: int = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def add_stage_times(self, stage_times: dict[str, float]) -> None:
+        for name, seconds in stage_times.items():
+            self.stage_times[name] = self.stage_times.get(name, 0.0) + seconds
+
+    def add_counters(self, counters: dict[str, int]) -> None:
+        for name, value in counters.items():
+            self.count(name, value)
+
+    def set_statistics(self, statistics: dict[str, float]) -> None:
+        self.statistics.update(statistics)
+
+    def flush(self) -> None:
+        if self.export_filename is not None and self.__export_frames:
+            self.__export(time.perf_counter())
+
+    def toggle_overlay(self) -> None:
+        self.overlay_enabled = not self.overlay_enabled
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        stages = sorted({name for frame in self.frames for name in frame})
+        summary: dict[str, dict[str, float]] = {}
+        for name in stages:
+            milliseconds = np.array([frame.get(name, 0.0) for frame in self.frames]) * 1000
+            summary[name] = {'mean_ms': float(milliseconds.mean())}
+            for percentile in PERCENTILES:
+                summary[name][f'p{percentile}_ms'] = float(np.percentile(milliseconds, percentile))
+        return summary
+
+    def counter_summary(self) -> dict[str, dict[str, float]]:
+        return self.__summarize_counters(self.frame_counters)
+
+    def draw_overlay(self, screen: Surface) -> None:
+        if not self.overlay_enabled:
+            return
+        if self.__font is None:
+            pygame.font.init()
+            self.__font = pygame.font.Font(None, OVERLAY_FONT_SIZE)
+        lines = [f"{name}: {seconds * 1000:.2f} ms" for name, seconds in sorted(self.last_stage_times.items())]
+        lines += [f"{name}: {value}" for name, value in sorted(self.last_counters.items())]
+        lines += [f"{name}: {self.__format_statistic(value)}" for name, value in sorted(self.statistics.items())]
+        labels = [self.__font.render(line, True, OVERLAY_COLOR) for line in lines]
+        if not labels:
+            return
+        line_height = self.__font.get_linesize()
+        background = Surface((max(label.get_width() for label in labels) + 2 * OVERLAY_MARGIN,
+                              line_height * len(labels) + 2 * OVERLAY_MARGIN), pygame.SRCALPHA)
+        background.fill(OVERLAY_BACKGROUND)
+        for i, label in enumerate(labels):
+            background.blit(label, (OVERLAY_MARGIN, OVERLAY_MARGIN + i * line_height))
+        screen.blit(background, (0, 0))
+
+    def __export(self, end: float) -> None:
+        frames = self.__export_frames
+        stages = sorted({name for stage_times, _ in frames for name in stage_times})
+        record = {
+            'time': time.time(),
+            'interval_s': end - self.__export_start,
+            'frames': len(frames),
+            'stages': {name: self.__summarize_milliseconds(np.array([stage_times.get(name, 0.0) for stage_times, _ in frames]) * 1000)
+                       for name in stages},
+            'counters': self.__summarize_counters([counters for _, counters in frames]),
+            'statistics': self.statistics
+        }
+        with open(self.export_filename, 'a') as file:
+            file.write(json.dumps(record) + '\n')
+        self.__export_frames = []
+        self.__export_start = end
+
+    def __summarize_counters(self, frame_counters: list[dict[str, int]]) -> dict[str, dict[str, float]]:
+        names = sorted({name for counters in frame_counters for name in counters})
+        summary: dict[str, dict[str, float]] = {}
+        for name in names:
+            values = np.array([counters.get(name, 0) for counters in frame_counters], dtype=np.float64)
+            summary[name] = {'mean': float(values.mean()), 'max': float(values.max())}
+        return summary
+
+    def __summarize_milliseconds(self, milliseconds: np.ndarray) -> dict[str, float]:
+        return {'mean_ms': float(milliseconds.mean()), 'max_ms': float(milliseconds.max())}
+
+    def __format_statistic(self, value: float) -> str:
+        return f"{value:.2f}" if isinstance(value, float) else str(value)